@@ -1,14 +1,30 @@
 import json
 import os
+import time
 import boto3
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
-from willa_rest_api.controllers.saves import list_saves_controller, get_save_by_id_controller
-from willa_rest_api.controllers.metrics import get_general_metrics_controller, get_time_series_metrics_controller
-from willa_rest_api.controllers.boards import list_boards_controller
-from willa_rest_api.controllers.users import list_users_controller
-from willa_admin_agent.agent import call_agent
+from willa_rest_api.router import handle_rest
+from willa_rest_api.utils.response import respond
+from willa_rest_api.services.metrics import get_cached_general_metrics, get_time_series_metrics
+from willa_rest_api.services.saves import list_saves_service, get_saves_count
+from willa_rest_api.services.boards import list_boards_service, get_boards_count
+from willa_rest_api.utils.admission import query_priority
+from willa_rest_api.utils.athena import ATHENA_RESULT_CACHE_TTL_S, get_athena_client
+from willa_rest_api.utils.deadline import Deadline, DeadlineExceeded, deadline_scope
+from willa_rest_api.utils.hot_tier import HOT_TIER_ENABLED, prime_hot_tier
+from willa_admin_agent.agent import call_agent, get_agent
+from willa_admin_agent.utils.helpers import _get_data_dictionary
+from willa_admin_agent.utils.tools import get_table_catalog
+from willa_admin_agent.utils.memory import clear_conversation
+from willa_admin_agent.utils.chat_jobs import (
+    CHAT_SUPERSEDE_POLL_S,
+    begin_chat_job,
+    clear_chat_jobs,
+    finish_chat_job,
+    is_current_job,
+)
 
 load_dotenv()
 
@@ -16,13 +32,46 @@ LAMBDA_CLIENT = boto3.client("lambda")
 # WS_MANAGEMENT_BASE = "https://eqqrx1ycgl.execute-api.us-east-1.amazonaws.com/prod"
 WS_MANAGEMENT_BASE = os.getenv("ADMIN_WSS_MANAGEMENT_BASE")
 
+# Budget for one chat run; the Lambda's own remaining time still wins if it is shorter
+CHAT_TIMEOUT_S = float(os.getenv("CHAT_TIMEOUT_S", "60"))
+# Time kept back after the chat deadline to post the reply over the WebSocket
+CHAT_RESERVE_MS = int(os.getenv("CHAT_RESERVE_MS", "3000"))
+# API Gateway REST integrations time out at 29 seconds
+REST_TIMEOUT_S = float(os.getenv("REST_TIMEOUT_S", "28"))
+# How often the warm-up schedule fires; data that would expire sooner is not primed
+WARMUP_INTERVAL_S = float(os.getenv("WARMUP_INTERVAL_S", "300"))
+
 print(f"WS_MANAGEMENT_BASE: {WS_MANAGEMENT_BASE}")
 
+_WS_MANAGEMENT_CLIENT = None
+
+
+def get_ws_management_client():
+    """API Gateway management client for posting WebSocket replies, created once per container."""
+    global _WS_MANAGEMENT_CLIENT
+    if _WS_MANAGEMENT_CLIENT is None:
+        _WS_MANAGEMENT_CLIENT = boto3.client("apigatewaymanagementapi", endpoint_url=WS_MANAGEMENT_BASE)
+    return _WS_MANAGEMENT_CLIENT
+
+
+def is_warmup_event(event) -> bool:
+    """Scheduled warm-up: an EventBridge 'Scheduled Event' or an explicit {"warmup": true} payload."""
+    if not isinstance(event, dict):
+        return False
+    if event.get("warmup"):
+        return True
+    return event.get("source") == "aws.events" and event.get("detail-type") == "Scheduled Event"
+
+
 def handler(event, context):
     try:
+        # Scheduled warm-up: prime clients, agent and caches
+        if is_warmup_event(event):
+            return handle_warmup(event, context)
+
         # Async task handler (self-invoked)
         if isinstance(event, dict) and event.get("asyncTask") == "chat":
-            return handle_async_chat(event)
+            return handle_async_chat(event, context)
 
         # Detect API Gateway WebSocket events
         request_context = (event or {}).get("requestContext") or {}
@@ -32,6 +81,8 @@ def handler(event, context):
             if route_key == "$connect":
                 return {"statusCode": 200}
             if route_key == "$disconnect":
+                clear_conversation(request_context.get("connectionId"))
+                clear_chat_jobs(request_context.get("connectionId"))
                 return {"statusCode": 200}
             # "$default" or "chat"
             body_str = (event or {}).get("body") or ""
@@ -40,11 +91,20 @@ def handler(event, context):
             except Exception:
                 data = {}
             message = data.get("message")
+            connection_id = request_context.get("connectionId")
+            # Double-submits/retries of the question still running attach to that run (its answer
+            # is posted to this connection); a different question supersedes it. The job store is
+            # shared across containers, since the running chat is always in another one.
+            job_id, duplicate = begin_chat_job(connection_id, message or "")
+            if duplicate:
+                print(f"[chat] duplicate of running job={job_id} connection={connection_id}")
+                return {"statusCode": 200}
             # Kick off async processing and return immediately
             async_payload = {
                 "asyncTask": "chat",
                 "message": message,
-                "connectionId": request_context.get("connectionId"),
+                "jobId": job_id,
+                "connectionId": connection_id,
                 "domainName": request_context.get("domainName"),
                 "stage": request_context.get("stage"),
             }
@@ -56,73 +116,76 @@ def handler(event, context):
             )
             return {"statusCode": 200}
 
-        # Fallback HTTP REST
-        path = (event or {}).get("path", "")
-        method = (event or {}).get("httpMethod", "")
-        # New: GET /saves → list_saves_controller handles query params and response
-        if method == "GET" and path.endswith("/saves"):
-            return list_saves_controller(event)
-        # GET /saves/{id} → get single save by id
-        if method == "GET" and "/saves/" in path:
-            return get_save_by_id_controller(event)
-        # GET /metrics → consolidated counts
-        if method == "GET" and path.endswith("/metrics"):
-            return get_general_metrics_controller(event)
-        # GET /metrics/timeseries → day-by-day counts
-        if method == "GET" and path.endswith("/metrics/timeseries"):
-            return get_time_series_metrics_controller(event)
-        # GET /boards → list boards
-        if method == "GET" and path.endswith("/boards"):
-            return list_boards_controller(event)
-        # GET /users → list Cognito users
-        if method == "GET" and path.endswith("/users"):
-            return list_users_controller(event)
-        # Fallback hello for other routes/tests
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "*",
-                "Access-Control-Allow-Methods": "GET,OPTIONS",
-            },
-            "body": json.dumps({"message": "hello world"})
-        }
+        # Fallback HTTP REST, bounded by the request deadline
+        with deadline_scope(Deadline.from_lambda_context(context, cap_s=REST_TIMEOUT_S)):
+            return handle_rest(event)
+    except DeadlineExceeded as e:
+        return respond(event, 504, {"error": str(e), "code": "deadline_exceeded"})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "*",
-                "Access-Control-Allow-Methods": "GET,OPTIONS",
-            },
-            "body": json.dumps({"error": str(e)})
-        }
-
-def handle_async_chat(event: dict):
+        return respond(event, 500, {"error": str(e)})
+
+def handle_async_chat(event: dict, context=None):
     """
-    Long-running chat processing with a 60-second timeout, then post back over WS.
+    Long-running chat processing bounded by a deadline (CHAT_TIMEOUT_S or the Lambda's remaining
+    time, whichever is shorter), then post back over WS. On timeout, in-flight Athena queries are
+    stopped, the agent thread is abandoned and a structured timeout is posted instead.
+    A run superseded by a newer question on the same connection is cancelled the same way
+    and posts nothing.
     """
     connection_id = event.get("connectionId")
     message = event.get("message") or ""
-    # Use hard-coded management API base URL
-    apigw_mgmt = boto3.client("apigatewaymanagementapi", endpoint_url=WS_MANAGEMENT_BASE)
+    job_id = event.get("jobId")
+    if not is_current_job(connection_id, job_id):
+        print(f"[chat] superseded before start job={job_id} connection={connection_id}")
+        return {"statusCode": 200}
+    apigw_mgmt = get_ws_management_client()
+    deadline = Deadline.from_lambda_context(context, reserve_ms=CHAT_RESERVE_MS, cap_s=CHAT_TIMEOUT_S)
+    # The Lambda's remaining time may have cut this below CHAT_TIMEOUT_S; report what we really had
+    budget_s = round(deadline.remaining(), 1)
 
     def run_agent():
-        return call_agent(message)
+        with deadline_scope(deadline):
+            return call_agent(message, connection_id=connection_id)
 
+    error = None
+    superseded = False
+    response_text = ""
+    executor = ThreadPoolExecutor(max_workers=1)
     try:
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(run_agent)
-            result = future.result(timeout=60)
+        future = executor.submit(run_agent)
+        while True:
+            try:
+                result = future.result(timeout=min(CHAT_SUPERSEDE_POLL_S, deadline.remaining()))
+                break
+            except FuturesTimeout:
+                if deadline.expired():
+                    raise
+                if not is_current_job(connection_id, job_id):
+                    superseded = True
+                    break
+        if superseded:
+            deadline.cancel()
+        else:
             response_text = result if isinstance(result, str) else str(result)
-    except FuturesTimeout:
+    except (FuturesTimeout, DeadlineExceeded):
+        deadline.cancel()
         response_text = "We encountered an issue processing your request. Please try again."
+        error = {"code": "timeout", "timeoutSeconds": budget_s}
     except Exception as e:
         response_text = f"Error: {str(e)}"
+    finally:
+        # Do not block on an abandoned agent thread; the deadline makes it stop at its next check
+        executor.shutdown(wait=False, cancel_futures=True)
+        finish_chat_job(connection_id, job_id)
+
+    # A newer question may have arrived while this one was finishing; only its answer is posted
+    if superseded or not is_current_job(connection_id, job_id):
+        print(f"[chat] superseded job={job_id} connection={connection_id}")
+        return {"statusCode": 200}
 
     payload = {"type": "chat_response", "message": response_text}
+    if error:
+        payload["error"] = error
     try:
         apigw_mgmt.post_to_connection(ConnectionId=connection_id, Data=json.dumps(payload).encode("utf-8"))
     except ClientError as ce:
@@ -132,3 +195,75 @@ def handle_async_chat(event: dict):
             raise
     return {"statusCode": 200}
 
+
+def handle_warmup(event: dict, context=None):
+    """
+    Prime everything the first real request would otherwise pay for: boto3 clients, the agent
+    graph, general metrics, the 30-day time series, first pages of /saves and /boards, the
+    schema catalog and (when enabled) the hot tier. Data steps run concurrently at export priority
+    so live traffic is not delayed. Steps whose cache expires before the next warm-up
+    (WARMUP_INTERVAL_S) are skipped: with the default 60s result cache, that is the first pages.
+    Returns per-step status and duration.
+    """
+    started = time.time()
+    steps = []
+
+    def timed(name, fn):
+        t0 = time.time()
+        try:
+            fn()
+            step = {"name": name, "ok": True}
+        except Exception as e:
+            step = {"name": name, "ok": False, "error": str(e)}
+        step["ms"] = round((time.time() - t0) * 1000, 1)
+        return step
+
+    def prime_clients():
+        get_athena_client()
+        get_ws_management_client()
+
+    def prime_schema():
+        tables = get_table_catalog()
+        if isinstance(tables, str):
+            raise RuntimeError(tables)
+        for table in ("latest_entity_save", "latest_entity_board", "latest_entity_edge"):
+            _get_data_dictionary(table)
+
+    steps.append(timed("clients", prime_clients))
+    steps.append(timed("agent", get_agent))
+
+    data_steps = [
+        ("general_metrics", get_cached_general_metrics),
+        ("timeseries_30d", lambda: get_time_series_metrics(days=30)),
+        ("schema_catalog", prime_schema),
+    ]
+    listing_steps = [
+        ("saves_first_page", lambda: (list_saves_service(limit=20, offset=0), get_saves_count())),
+        ("boards_first_page", lambda: (list_boards_service(limit=20, offset=0), get_boards_count())),
+    ]
+    if ATHENA_RESULT_CACHE_TTL_S >= WARMUP_INTERVAL_S:
+        data_steps.extend(listing_steps)
+    else:
+        # Listings live in the Athena result cache and would expire before any real request
+        reason = f"result cache TTL {ATHENA_RESULT_CACHE_TTL_S:g}s < warm-up interval {WARMUP_INTERVAL_S:g}s"
+        steps.extend({"name": name, "ok": True, "skipped": reason, "ms": 0.0} for name, _ in listing_steps)
+    if HOT_TIER_ENABLED:
+        data_steps.append(("hot_tier", prime_hot_tier))
+    deadline = Deadline.from_lambda_context(context, cap_s=REST_TIMEOUT_S)
+
+    def run_step(name, fn):
+        with deadline_scope(deadline), query_priority("export"):
+            return timed(name, fn)
+
+    with ThreadPoolExecutor(max_workers=len(data_steps)) as executor:
+        futures = [executor.submit(run_step, name, fn) for name, fn in data_steps]
+        steps.extend(f.result() for f in futures)
+
+    result = {
+        "warmup": True,
+        "ok": all(step["ok"] for step in steps),
+        "totalMs": round((time.time() - started) * 1000, 1),
+        "steps": steps,
+    }
+    print(f"[warmup] {json.dumps(result)}")
+    return result
@@ -0,0 +1,398 @@
+"""
+Local load test for the WebSocket chat path:
+  $default route -> LAMBDA_CLIENT.invoke (self, async) -> handle_async_chat -> agent -> post_to_connection
+
+index.handler is driven with many simulated connections. AWS and OpenAI are replaced by stubs:
+a Lambda client that runs async invocations on a local pool, a management API client that records
+replies, a scripted chat model (one query_athena_sql call, then an answer) and a fake Athena
+client with configurable latency. Everything runs in one process, so the shared tool pool,
+admission scheduler and caches see the combined load of all invocations, i.e. the worst case
+of many invocations landing on one warm container.
+
+Usage:
+  python -m loadtest.chat_load --connections 20 --messages 3 --athena-latency 0.5 --llm-latency 0.3
+  make loadtest LOADTEST_ARGS="--connections 50 --chat-timeout 10"
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the WebSocket chat path with stubbed AWS and LLM.")
+    parser.add_argument("--connections", type=int, default=20, help="simulated concurrent WebSocket connections")
+    parser.add_argument("--messages", type=int, default=3, help="messages sent by each connection, one at a time")
+    parser.add_argument("--think-time", type=float, default=0.2, help="seconds between a reply and the next message")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="mean seconds per chat model call")
+    parser.add_argument("--athena-latency", type=float, default=0.5, help="mean seconds per Athena execution")
+    parser.add_argument("--jitter", type=float, default=0.3, help="uniform +/- fraction applied to latencies")
+    parser.add_argument("--lambda-concurrency", type=int, default=100, help="async invocations run at once")
+    parser.add_argument("--lambda-timeout", type=float, default=120.0, help="simulated Lambda timeout (s)")
+    parser.add_argument("--chat-timeout", type=float, default=None, help="override CHAT_TIMEOUT_S")
+    parser.add_argument("--reply-wait", type=float, default=None, help="give up waiting for a reply after (s)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def _jittered(mean: float, jitter: float) -> float:
+    return max(0.0, mean * random.uniform(1 - jitter, 1 + jitter))
+
+
+class FakeAthenaClient:
+    """Athena client whose executions finish after a configurable latency."""
+
+    def __init__(self, latency_s: float, jitter: float):
+        self.latency_s = latency_s
+        self.jitter = jitter
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._executions: Dict[str, Dict[str, Any]] = {}
+        self.started = 0
+        self.stopped = 0
+
+    def start_query_execution(self, **kwargs: Any) -> Dict[str, Any]:
+        qid = f"load-{next(self._ids)}"
+        with self._lock:
+            self.started += 1
+            self._executions[qid] = {
+                "done_at": time.time() + _jittered(self.latency_s, self.jitter),
+                "sql": kwargs.get("QueryString", ""),
+                "state": None,
+            }
+        return {"QueryExecutionId": qid}
+
+    def get_query_execution(self, QueryExecutionId: str) -> Dict[str, Any]:
+        with self._lock:
+            execution = self._executions[QueryExecutionId]
+        state = execution["state"] or ("SUCCEEDED" if time.time() >= execution["done_at"] else "RUNNING")
+        elapsed_ms = int(self.latency_s * 1000)
+        return {
+            "QueryExecution": {
+                "Status": {"State": state},
+                "Statistics": {
+                    "QueryQueueTimeInMillis": 0,
+                    "EngineExecutionTimeInMillis": elapsed_ms,
+                    "TotalExecutionTimeInMillis": elapsed_ms,
+                    "DataScannedInBytes": 1024,
+                },
+            }
+        }
+
+    def get_query_results(self, QueryExecutionId: str, **kwargs: Any) -> Dict[str, Any]:
+        with self._lock:
+            sql = self._executions[QueryExecutionId]["sql"]
+        if sql.startswith("EXPLAIN"):
+            plan = {"inputTableColumnInfos": [{"estimate": {"outputSizeInBytes": "1048576"}}]}
+            return {"ResultSet": {"Rows": [{"Data": [{"VarCharValue": "Query Plan"}]}, {"Data": [{"VarCharValue": json.dumps(plan)}]}]}}
+        return {
+            "ResultSet": {
+                "Rows": [
+                    {"Data": [{"VarCharValue": "total"}]},
+                    {"Data": [{"VarCharValue": str(random.randint(1, 10000))}]},
+                ]
+            }
+        }
+
+    def stop_query_execution(self, QueryExecutionId: str) -> Dict[str, Any]:
+        with self._lock:
+            self.stopped += 1
+            if QueryExecutionId in self._executions:
+                self._executions[QueryExecutionId]["state"] = "CANCELLED"
+        return {}
+
+    def get_work_group(self, WorkGroup: str) -> Dict[str, Any]:
+        return {"WorkGroup": {"Configuration": {"ResultConfiguration": {"OutputLocation": "s3://load-test/"}}}}
+
+
+class StubLambdaContext:
+    def __init__(self, timeout_s: float):
+        self.invoked_function_arn = "arn:aws:lambda:us-east-1:000000000000:function:admin-load-test"
+        self.aws_request_id = f"load-{random.getrandbits(32):08x}"
+        self._expires_at = time.time() + timeout_s
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._expires_at - time.time()) * 1000))
+
+
+class StubLambdaClient:
+    """Runs InvocationType=Event self-invocations on a local pool, like Lambda's async queue."""
+
+    def __init__(self, handler, concurrency: int, timeout_s: float):
+        self._handler = handler
+        self._timeout_s = timeout_s
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="lambda-async")
+        self.invocations = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, FunctionName: str, InvocationType: str, Payload: bytes) -> Dict[str, Any]:
+        event = json.loads(Payload)
+        with self._lock:
+            self.invocations += 1
+
+        def run():
+            try:
+                self._handler(event, StubLambdaContext(self._timeout_s))
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"[loadtest:async:error] {e}", file=sys.stderr)
+
+        self._pool.submit(run)
+        return {"StatusCode": 202}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class StubManagementClient:
+    """Captures post_to_connection replies and wakes the connection waiting for them."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._replies: Dict[str, List[Dict[str, Any]]] = {}
+
+    def post_to_connection(self, ConnectionId: str, Data: bytes) -> Dict[str, Any]:
+        reply = {"at": time.time(), "payload": json.loads(Data)}
+        with self._cond:
+            self._replies.setdefault(ConnectionId, []).append(reply)
+            self._cond.notify_all()
+        return {}
+
+    def wait_for_reply(self, connection_id: str, timeout_s: float) -> Optional[Dict[str, Any]]:
+        deadline = time.time() + timeout_s
+        with self._cond:
+            while not self._replies.get(connection_id):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._replies[connection_id].pop(0)
+
+
+def make_chat_model(latency_s: float, jitter: float):
+    """Chat model that asks for one Athena query, then answers once it has the tool result."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    calls = itertools.count()
+
+    class ScriptedChatModel(BaseChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "loadtest-scripted"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(_jittered(latency_s, jitter))
+            usage = {"input_tokens": 50 * len(messages), "output_tokens": 40, "total_tokens": 50 * len(messages) + 40}
+            if isinstance(messages[-1], ToolMessage):
+                message = AIMessage(content=f"There are **{messages[-1].content}** results.", usage_metadata=usage)
+            else:
+                message = AIMessage(
+                    content="",
+                    tool_calls=[{
+                        "name": "query_athena_sql",
+                        "args": {"query": "SELECT COUNT(1) AS total FROM latest_entity_save WHERE username = 'load'"},
+                        "id": f"call-{next(calls)}",
+                    }],
+                    usage_metadata=usage,
+                )
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    return ScriptedChatModel()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except Exception:
+        return 0.0
+
+
+class ResourceMonitor(threading.Thread):
+    """Samples live thread count and resident memory while the test runs."""
+
+    def __init__(self, interval_s: float = 0.1):
+        super().__init__(name="loadtest-monitor", daemon=True)
+        self.interval_s = interval_s
+        self.peak_threads = threading.active_count()
+        self.peak_rss_mb = _rss_mb()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval_s):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss_mb = max(self.peak_rss_mb, _rss_mb())
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # Configure before index and the agent read their settings at import time
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    os.environ["TRACE_SAMPLE_RATE"] = "0"
+    if args.chat_timeout is not None:
+        os.environ["CHAT_TIMEOUT_S"] = str(args.chat_timeout)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    import index
+    import willa_admin_agent.agent as agent_module
+    import willa_admin_agent.utils.helpers as agent_helpers
+    import willa_rest_api.utils.athena as athena_utils
+    from willa_admin_agent.utils.chat_jobs import MemoryChatJobBackend, set_chat_job_backend
+    from willa_admin_agent.utils.memory import MemoryConversationBackend, set_conversation_backend
+
+    athena = FakeAthenaClient(args.athena_latency, args.jitter)
+    agent_helpers.athena = athena
+    athena_utils.get_athena_client = lambda region=None: athena
+    chat_model = make_chat_model(args.llm_latency, args.jitter)
+    agent_module.ChatOpenAI = lambda **kwargs: chat_model
+    agent_module._agent = None
+    set_conversation_backend(MemoryConversationBackend())
+    # All simulated invocations share this process, so an in-memory job store is shared too
+    set_chat_job_backend(MemoryChatJobBackend())
+    lambda_client = StubLambdaClient(index.handler, args.lambda_concurrency, args.lambda_timeout)
+    management = StubManagementClient()
+    index.LAMBDA_CLIENT = lambda_client
+    index._WS_MANAGEMENT_CLIENT = management
+    reply_wait = args.reply_wait or index.CHAT_TIMEOUT_S + 30
+
+    results: List[Dict[str, Any]] = []
+    results_lock = threading.Lock()
+
+    def ws_event(route_key: str, connection_id: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        event: Dict[str, Any] = {
+            "requestContext": {
+                "routeKey": route_key,
+                "connectionId": connection_id,
+                "domainName": "load.test",
+                "stage": "test",
+            }
+        }
+        if body is not None:
+            event["body"] = json.dumps(body)
+        return event
+
+    def connection(i: int) -> None:
+        connection_id = f"conn-{i}"
+        context = StubLambdaContext(args.lambda_timeout)
+        index.handler(ws_event("$connect", connection_id), context)
+        for n in range(args.messages):
+            sent_at = time.time()
+            index.handler(ws_event("$default", connection_id, {"message": f"How many saves? ({i}.{n})"}), context)
+            reply = management.wait_for_reply(connection_id, reply_wait)
+            outcome: Dict[str, Any] = {"connection": connection_id}
+            if reply is None:
+                outcome.update(status="no_reply", latency_s=reply_wait)
+            else:
+                payload = reply["payload"]
+                error = payload.get("error") or {}
+                if error.get("code") == "timeout":
+                    status = "timeout"
+                elif str(payload.get("message", "")).startswith("Error:"):
+                    status = "error"
+                else:
+                    status = "ok"
+                outcome.update(status=status, latency_s=reply["at"] - sent_at)
+            with results_lock:
+                results.append(outcome)
+            time.sleep(_jittered(args.think_time, args.jitter))
+        index.handler(ws_event("$disconnect", connection_id), context)
+
+    threads_before = threading.active_count()
+    monitor = ResourceMonitor()
+    monitor.start()
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=args.connections, thread_name_prefix="ws-client") as clients:
+        list(clients.map(connection, range(args.connections)))
+    wall_s = time.time() - started
+    monitor.stop()
+    lambda_client.shutdown()
+
+    latencies = sorted(r["latency_s"] for r in results if r["status"] in ("ok", "error"))
+    by_status: Dict[str, int] = {}
+    for r in results:
+        by_status[r["status"]] = by_status.get(r["status"], 0) + 1
+    total = len(results)
+    completed = by_status.get("ok", 0)
+    return {
+        "config": {
+            "connections": args.connections,
+            "messagesPerConnection": args.messages,
+            "llmLatencyS": args.llm_latency,
+            "athenaLatencyS": args.athena_latency,
+            "chatTimeoutS": index.CHAT_TIMEOUT_S,
+            "lambdaConcurrency": args.lambda_concurrency,
+        },
+        "wallS": round(wall_s, 2),
+        "messages": total,
+        "outcomes": by_status,
+        "throughputPerS": round(completed / wall_s, 2) if wall_s else 0.0,
+        "timeoutRate": round((by_status.get("timeout", 0) + by_status.get("no_reply", 0)) / total, 4) if total else 0.0,
+        "latencyS": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p90": round(_percentile(latencies, 90), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "threads": {"before": threads_before, "peak": monitor.peak_threads, "after": threading.active_count()},
+        "memoryMb": {
+            "peakRss": round(monitor.peak_rss_mb, 1),
+            "maxRss": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "athena": {"started": athena.started, "stopped": athena.stopped},
+        "asyncInvocations": {"count": lambda_client.invocations, "errors": lambda_client.errors},
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    cfg = report["config"]
+    lat = report["latencyS"]
+    lines = [
+        f"connections={cfg['connections']} messages/conn={cfg['messagesPerConnection']} "
+        f"llm={cfg['llmLatencyS']}s athena={cfg['athenaLatencyS']}s chatTimeout={cfg['chatTimeoutS']}s",
+        f"messages      {report['messages']} in {report['wallS']}s  outcomes={report['outcomes']}",
+        f"throughput    {report['throughputPerS']} replies/s",
+        f"latency (s)   p50={lat['p50']} p90={lat['p90']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}",
+        f"timeout rate  {report['timeoutRate'] * 100:.2f}%",
+        f"threads       before={report['threads']['before']} peak={report['threads']['peak']} after={report['threads']['after']}",
+        f"memory (MB)   peakRss={report['memoryMb']['peakRss']} maxRss={report['memoryMb']['maxRss']}",
+        f"athena        started={report['athena']['started']} stopped={report['athena']['stopped']}",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
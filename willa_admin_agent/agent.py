@@ -1,6 +1,14 @@
+import threading
 from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
+from langchain.agents.middleware import before_model
 from willa_admin_agent.utils.tools import query_athena_sql, list_athena_tables, describe_athena_table
+from willa_admin_agent.utils.tool_runner import run_tool_with_timeout, AGENT_TOOL_CONCURRENCY
+from willa_admin_agent.utils.memory import load_history, record_turn, extract_tool_results
+from willa_admin_agent.utils.llm_tracing import LLMTraceCallbackHandler
+from willa_admin_agent.utils.intents import answer_intent
+from willa_rest_api.utils.deadline import current_deadline
+from willa_rest_api.utils.tracing import span, start_trace
 
 # --- Build agent ---
 SYSTEM_PROMPT = """
@@ -10,6 +18,7 @@ Rules:
 - Think step-by-step.
 - Before querying the database, call the tool `list_athena_tables` to get a list of available tables.
 - Before querying a table, call the tool `describe_athena_table` with the table name to get the data dictionary.
+- When several tool calls do not depend on each other (e.g. describing multiple tables, or looking up a user while running an unrelated query), request them together in the same step; they run in parallel.
 - When you need data, call the tool `query_athena_sql` with ONE SELECT query.
 - Read-only only; no INSERT/UPDATE/DELETE/ALTER/DROP/CREATE/REPLACE/TRUNCATE.
 - If asked for a user's information, call the tool `get_cognito_user_info_by_sub` with the user's sub (username).
@@ -18,6 +27,7 @@ Rules:
 - If the tool returns 'Error:', revise the SQL and try again.
 - Prefer explicit column lists; avoid SELECT *.
 - Always use the query_athena_sql tool to answer any data-related questions.
+- Earlier turns of this conversation may list tool calls already made and their results. Reuse those tables, schemas, queries and results for follow-up questions instead of repeating the same tool calls; only query again for data you do not have yet.
 
 Formatting rules:
 - Always respond in **Markdown**.
@@ -27,13 +37,32 @@ Formatting rules:
 - Keep responses concise and well-structured for readability.
 """
 
-model = ChatOpenAI(model="gpt-4o-mini")
+@before_model
+def enforce_deadline(state, runtime):
+    """Stop the agent loop before another LLM call once the request deadline has passed."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+    return None
 
-agent = create_agent(
-    model,
-    tools=[query_athena_sql, list_athena_tables, describe_athena_table],
-    system_prompt=SYSTEM_PROMPT,
-)
+
+_agent = None
+_agent_lock = threading.Lock()
+
+
+def get_agent():
+    """Build the model client and agent graph on first use and reuse them for the container's lifetime."""
+    global _agent
+    with _agent_lock:
+        if _agent is None:
+            model = ChatOpenAI(model="gpt-4o-mini")
+            _agent = create_agent(
+                model,
+                tools=[query_athena_sql, list_athena_tables, describe_athena_table],
+                system_prompt=SYSTEM_PROMPT,
+                middleware=[enforce_deadline, run_tool_with_timeout],
+            )
+        return _agent
 
 # Call the agent
 # result = agent.invoke({"messages": [{"role": "user", "content": "Which table has the most rows?"}]})
@@ -52,6 +81,41 @@ agent = create_agent(
 # result = agent.invoke({"messages": [{"role": "user", "content": "Which table has the most rows?"}]})
 # print(result["messages"][-1].content)
 
-def call_agent(message: str):
-    result = agent.invoke({"messages": [{"role": "user", "content": message}]})
-    return result["messages"][-1].content
\ No newline at end of file
+def call_agent(message: str, connection_id: str | None = None):
+    """
+    Answer `message`, replaying this connection's prior turns (compacted to a token budget)
+    so follow-ups can reuse earlier schema lookups and query results.
+    Simple counts and recents are answered directly from the REST services (see utils.intents);
+    everything else runs the agent.
+    Sampled runs (TRACE_SAMPLE_RATE) export a trace of LLM calls, tool calls and Athena queries.
+    """
+    with start_trace("call_agent", connection=connection_id, message=message) as root:
+        with span("intent") as intent_span:
+            fast = answer_intent(message)
+            if intent_span is not None:
+                intent_span.set(intent=fast[0] if fast else None)
+        if fast is not None:
+            with span("memory.record"):
+                record_turn(connection_id, message, fast[1], [])
+            return fast[1]
+        with span("memory.load"):
+            history = load_history(connection_id)
+        config = {"max_concurrency": AGENT_TOOL_CONCURRENCY}
+        llm_trace = LLMTraceCallbackHandler() if root is not None else None
+        if llm_trace is not None:
+            config["callbacks"] = [llm_trace]
+        result = get_agent().invoke(
+            {"messages": history + [{"role": "user", "content": message}]},
+            config=config,
+        )
+        answer = result["messages"][-1].content
+        new_messages = result["messages"][len(history) + 1:]
+        with span("memory.record"):
+            record_turn(connection_id, message, answer, extract_tool_results(new_messages))
+        if llm_trace is not None:
+            root.set(
+                llmCalls=llm_trace.calls,
+                inputTokens=llm_trace.input_tokens,
+                outputTokens=llm_trace.output_tokens,
+            )
+        return answer
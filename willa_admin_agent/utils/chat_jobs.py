@@ -0,0 +1,317 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+# Dedupe/supersede only work when every container sees the same store: Lambda runs one
+# invocation per container, so a follow-up message always lands in a different container than
+# the running chat. dynamodb (default) is shared; sqlite and memory are single-container
+# stand-ins for local runs; none turns job tracking off.
+CHAT_JOBS_BACKEND = os.getenv("CHAT_JOBS_BACKEND", "dynamodb").lower()
+CHAT_JOBS_TABLE = os.getenv("CHAT_JOBS_TABLE", "willa-admin-chat-jobs")
+CHAT_JOBS_PATH = os.getenv("CHAT_JOBS_PATH", "/tmp/willa_chat_jobs.sqlite3")
+# A running job older than this is presumed dead (crashed or frozen invocation) and never joined
+CHAT_JOB_TTL_S = float(os.getenv("CHAT_JOB_TTL_S", "90"))
+# How often a running chat checks whether a newer question superseded it
+CHAT_SUPERSEDE_POLL_S = float(os.getenv("CHAT_SUPERSEDE_POLL_S", "1"))
+
+
+def message_fingerprint(message: str) -> str:
+    """Case- and whitespace-insensitive fingerprint, so double-submits and retries compare equal."""
+    text = re.sub(r"\s+", " ", (message or "").strip().lower())
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class MemoryChatJobBackend:
+    """In-flight chat jobs kept only for the lifetime of the container (local runs and load tests)."""
+
+    def __init__(self, ttl_s: float = CHAT_JOB_TTL_S):
+        self.ttl_s = ttl_s
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, connection_id: str, fingerprint: str) -> Tuple[str, bool]:
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(connection_id)
+            if (
+                job is not None
+                and job["status"] == "running"
+                and job["fingerprint"] == fingerprint
+                and now - job["started_at"] <= self.ttl_s
+            ):
+                return job["job_id"], True
+            job_id = uuid.uuid4().hex
+            self._jobs[connection_id] = {
+                "job_id": job_id,
+                "fingerprint": fingerprint,
+                "status": "running",
+                "started_at": now,
+            }
+            return job_id, False
+
+    def current_job(self, connection_id: str) -> Optional[str]:
+        with self._lock:
+            job = self._jobs.get(connection_id)
+            return job["job_id"] if job else None
+
+    def finish(self, connection_id: str, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(connection_id)
+            if job is not None and job["job_id"] == job_id:
+                job["status"] = "done"
+
+    def clear(self, connection_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(connection_id, None)
+
+
+class SQLiteChatJobBackend:
+    """
+    Local SQLite stand-in for a shared in-flight job store (one row per connection holding its
+    current job). Container-local, so not for deployed use. A shared store (e.g. DynamoDB) must
+    make begin() a single conditional write, as done here with BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, path: str = CHAT_JOBS_PATH, ttl_s: float = CHAT_JOB_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_jobs ("
+                "  connection_id TEXT PRIMARY KEY,"
+                "  job_id TEXT NOT NULL,"
+                "  fingerprint TEXT NOT NULL,"
+                "  status TEXT NOT NULL,"
+                "  started_at REAL NOT NULL"
+                ")"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def begin(self, connection_id: str, fingerprint: str) -> Tuple[str, bool]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT job_id, fingerprint, status, started_at FROM chat_jobs WHERE connection_id = ?",
+                    (connection_id,),
+                ).fetchone()
+                if row and row[2] == "running" and row[1] == fingerprint and now - row[3] <= self.ttl_s:
+                    conn.execute("COMMIT")
+                    return row[0], True
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT OR REPLACE INTO chat_jobs (connection_id, job_id, fingerprint, status, started_at) "
+                    "VALUES (?, ?, ?, 'running', ?)",
+                    (connection_id, job_id, fingerprint, now),
+                )
+                conn.execute("DELETE FROM chat_jobs WHERE started_at < ?", (now - 86400,))
+                conn.execute("COMMIT")
+                return job_id, False
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def current_job(self, connection_id: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT job_id FROM chat_jobs WHERE connection_id = ?", (connection_id,)
+                ).fetchone()
+            finally:
+                conn.close()
+        return row[0] if row else None
+
+    def finish(self, connection_id: str, job_id: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "UPDATE chat_jobs SET status = 'done' WHERE connection_id = ? AND job_id = ?",
+                    (connection_id, job_id),
+                )
+            finally:
+                conn.close()
+
+    def clear(self, connection_id: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM chat_jobs WHERE connection_id = ?", (connection_id,))
+            finally:
+                conn.close()
+
+
+class DynamoDBChatJobBackend:
+    """
+    In-flight job store shared by every container: one item per connection holding its current
+    job. Table: hash key `connectionId` (S); `expiresAt` (epoch seconds) should be enabled as the
+    table's TTL attribute. begin() is a single conditional put, so two containers racing on the
+    same connection cannot both start the same message.
+    """
+
+    def __init__(self, table: str = CHAT_JOBS_TABLE, ttl_s: float = CHAT_JOB_TTL_S, client: Any = None):
+        self.table = table
+        self.ttl_s = ttl_s
+        self._client = client or boto3.client("dynamodb")
+
+    def _key(self, connection_id: str) -> Dict[str, Any]:
+        return {"connectionId": {"S": connection_id}}
+
+    def begin(self, connection_id: str, fingerprint: str) -> Tuple[str, bool]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        try:
+            self._client.put_item(
+                TableName=self.table,
+                Item={
+                    **self._key(connection_id),
+                    "jobId": {"S": job_id},
+                    "fingerprint": {"S": fingerprint},
+                    "status": {"S": "running"},
+                    "startedAt": {"N": str(now)},
+                    "expiresAt": {"N": str(int(now + 86400))},
+                },
+                # Replace the current job unless it is the same message, still running and fresh
+                ConditionExpression=(
+                    "attribute_not_exists(connectionId) OR #status <> :running "
+                    "OR #fingerprint <> :fingerprint OR #startedAt < :stale"
+                ),
+                ExpressionAttributeNames={"#status": "status", "#fingerprint": "fingerprint", "#startedAt": "startedAt"},
+                ExpressionAttributeValues={
+                    ":running": {"S": "running"},
+                    ":fingerprint": {"S": fingerprint},
+                    ":stale": {"N": str(now - self.ttl_s)},
+                },
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+            return job_id, False
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            running = (e.response.get("Item") or {}).get("jobId", {}).get("S") or self.current_job(connection_id)
+        if running is None:
+            raise RuntimeError(f"chat job for {connection_id} vanished during begin")
+        return running, True
+
+    def current_job(self, connection_id: str) -> Optional[str]:
+        item = self._client.get_item(
+            TableName=self.table,
+            Key=self._key(connection_id),
+            ConsistentRead=True,
+            ProjectionExpression="jobId",
+        ).get("Item")
+        return item["jobId"]["S"] if item else None
+
+    def finish(self, connection_id: str, job_id: str) -> None:
+        try:
+            self._client.update_item(
+                TableName=self.table,
+                Key=self._key(connection_id),
+                UpdateExpression="SET #status = :done",
+                ConditionExpression="jobId = :job",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":done": {"S": "done"}, ":job": {"S": job_id}},
+            )
+        except ClientError as e:
+            # A newer job replaced this one (or the connection was cleared); leave it alone
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+
+    def clear(self, connection_id: str) -> None:
+        self._client.delete_item(TableName=self.table, Key=self._key(connection_id))
+
+
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_chat_job_backend():
+    """
+    Return the installed backend, else the one named by CHAT_JOBS_BACKEND
+    (dynamodb | sqlite | memory), created once per container. None for CHAT_JOBS_BACKEND=none,
+    which turns job tracking off.
+    """
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            if CHAT_JOBS_BACKEND == "memory":
+                _BACKEND = MemoryChatJobBackend()
+            elif CHAT_JOBS_BACKEND == "sqlite":
+                _BACKEND = SQLiteChatJobBackend()
+            elif CHAT_JOBS_BACKEND == "dynamodb":
+                _BACKEND = DynamoDBChatJobBackend()
+        return _BACKEND
+
+
+def set_chat_job_backend(backend) -> None:
+    """Swap in another backend exposing begin/current_job/finish/clear (e.g. a stand-in for tests)."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        _BACKEND = backend
+
+
+def begin_chat_job(connection_id: Optional[str], message: str) -> Tuple[Optional[str], bool]:
+    """
+    Register `message` as the connection's current job: (job_id, duplicate).
+    An identical message while the previous one is still running returns that job with
+    duplicate=True, so the caller skips starting a new run; its answer is posted to the same
+    connection. Anything else supersedes the running job. Returns (None, False), i.e. untracked,
+    when tracking is off; store failures never block a chat.
+    """
+    backend = get_chat_job_backend()
+    if not connection_id or backend is None:
+        return None, False
+    try:
+        return backend.begin(connection_id, message_fingerprint(message))
+    except Exception as e:
+        print(f"[chat_jobs:begin:error] connection={connection_id} err={e}")
+        return None, False
+
+
+def is_current_job(connection_id: Optional[str], job_id: Optional[str]) -> bool:
+    """False once a newer message replaced job_id; True when untracked or the store is unavailable."""
+    backend = get_chat_job_backend()
+    if not connection_id or not job_id or backend is None:
+        return True
+    try:
+        current = backend.current_job(connection_id)
+    except Exception as e:
+        print(f"[chat_jobs:read:error] connection={connection_id} err={e}")
+        return True
+    return current is None or current == job_id
+
+
+def finish_chat_job(connection_id: Optional[str], job_id: Optional[str]) -> None:
+    backend = get_chat_job_backend()
+    if not connection_id or not job_id or backend is None:
+        return
+    try:
+        backend.finish(connection_id, job_id)
+    except Exception as e:
+        print(f"[chat_jobs:finish:error] connection={connection_id} err={e}")
+
+
+def clear_chat_jobs(connection_id: Optional[str]) -> None:
+    backend = get_chat_job_backend()
+    if not connection_id or backend is None:
+        return
+    try:
+        backend.clear(connection_id)
+    except Exception as e:
+        print(f"[chat_jobs:clear:error] connection={connection_id} err={e}")
@@ -2,6 +2,11 @@ from dotenv import load_dotenv
 import boto3
 import os
 import time
+from willa_rest_api.utils.admission import SCHEDULER, current_priority, workgroup_for
+from willa_rest_api.utils.athena import annotate_execution_stats, start_query_execution_with_retry
+from willa_rest_api.utils.deadline import DeadlineExceeded, current_deadline, stop_athena_query
+from willa_rest_api.utils.query import Query, as_query
+from willa_rest_api.utils.tracing import annotate, span
 
 load_dotenv()
 
@@ -13,77 +18,108 @@ ATHENA_WORKGROUP = "willa_datalake"
 athena = session.client("athena", region_name=ATHENA_REGION)
 
 # --- Helper Functions ---
-def _run_athena_query(query: str):
-    """Execute a SQL query in Athena and return results as a list of dicts."""
-    start_kwargs = {
-        "QueryString": query,
-        "QueryExecutionContext": {"Database": ATHENA_DATABASE},
-    }
-    print(f"[athena] region={ATHENA_REGION} db={ATHENA_DATABASE} wg={ATHENA_WORKGROUP} sql={query[:120]}")
-    # Prefer env-configured output/workgroup if provided
-    athena_output = None
-    if athena_output:
-        start_kwargs["ResultConfiguration"] = {"OutputLocation": athena_output}
-    athena_workgroup = ATHENA_WORKGROUP
-    if athena_workgroup:
-        start_kwargs["WorkGroup"] = athena_workgroup
-        # If no explicit output is set and the selected workgroup lacks a result location,
-        # fall back to 'primary' which commonly has a default output location configured.
-        if not athena_output:
+def _run_athena_query(query: str | Query):
+    """
+    Execute a SQL query (raw text or a parameterized Query) in Athena and return results as a list of dicts.
+    Raises DeadlineExceeded (after stopping the execution) once the request deadline passes.
+    """
+    query = as_query(query)
+    # Agent queries yield Athena concurrency to interactive dashboard queries; work already
+    # running at export priority (e.g. warm-up) stays there
+    priority = "export" if current_priority() == "export" else "agent"
+    with span("athena.query", sql=query.sql, priority=priority):
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check()
+        start_kwargs = {
+            "QueryString": query.sql,
+            "QueryExecutionContext": {"Database": ATHENA_DATABASE},
+        }
+        if query.params:
+            start_kwargs["ExecutionParameters"] = query.literals
+        print(f"[athena] region={ATHENA_REGION} db={ATHENA_DATABASE} wg={ATHENA_WORKGROUP} sql={query.sql[:120]}")
+        # Prefer env-configured output/workgroup if provided
+        athena_output = None
+        if athena_output:
+            start_kwargs["ResultConfiguration"] = {"OutputLocation": athena_output}
+        athena_workgroup = workgroup_for(priority, ATHENA_WORKGROUP)
+        if athena_workgroup:
+            start_kwargs["WorkGroup"] = athena_workgroup
+            # If no explicit output is set and the selected workgroup lacks a result location,
+            # fall back to 'primary' which commonly has a default output location configured.
+            if not athena_output:
+                try:
+                    wg = athena.get_work_group(WorkGroup=athena_workgroup)["WorkGroup"]
+                    has_output = bool(
+                        wg.get("Configuration", {})
+                        .get("ResultConfiguration", {})
+                        .get("OutputLocation")
+                    )
+                    if not has_output:
+                        start_kwargs["WorkGroup"] = "primary"
+                except Exception:
+                    # If introspection fails, leave the chosen workgroup as-is
+                    pass
+        with SCHEDULER.slot(priority, deadline) as waited:
+            annotate(admissionMs=round(waited * 1000, 1))
             try:
-                wg = athena.get_work_group(WorkGroup=athena_workgroup)["WorkGroup"]
-                has_output = bool(
-                    wg.get("Configuration", {})
-                    .get("ResultConfiguration", {})
-                    .get("OutputLocation")
-                )
-                if not has_output:
-                    start_kwargs["WorkGroup"] = "primary"
-            except Exception:
-                # If introspection fails, leave the chosen workgroup as-is
-                pass
-    try:
-        response = athena.start_query_execution(**start_kwargs)
-    except Exception as e:
-        print(f"[athena:start:error] {e}")
-        return f"Error: {str(e)}"
-    qid = response["QueryExecutionId"]
-    print(f"[athena] started qid={qid}")
+                qid = start_query_execution_with_retry(athena, start_kwargs, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                print(f"[athena:start:error] {e}")
+                return f"Error: {str(e)}"
+            print(f"[athena] started qid={qid}")
+            if deadline is not None:
+                deadline.register_query(athena, qid)
 
-    # Wait for query completion
-    while True:
-        try:
-            result = athena.get_query_execution(QueryExecutionId=qid)
-        except Exception as e:
-            print(f"[athena:poll:error] qid={qid} err={e}")
-            return f"Error: {str(e)}"
-        state = result["QueryExecution"]["Status"]["State"]
-        if state in ["SUCCEEDED", "FAILED", "CANCELLED"]:
-            break
-        time.sleep(1)
+            # Wait for query completion
+            try:
+                while True:
+                    try:
+                        result = athena.get_query_execution(QueryExecutionId=qid)
+                    except Exception as e:
+                        print(f"[athena:poll:error] qid={qid} err={e}")
+                        return f"Error: {str(e)}"
+                    state = result["QueryExecution"]["Status"]["State"]
+                    if state in ["SUCCEEDED", "FAILED", "CANCELLED"]:
+                        break
+                    sleep_s = 1.0
+                    if deadline is not None:
+                        if deadline.expired():
+                            stop_athena_query(athena, qid)
+                            raise DeadlineExceeded(f"Athena query {qid} cancelled at request deadline")
+                        sleep_s = min(sleep_s, deadline.remaining())
+                    time.sleep(sleep_s)
+            finally:
+                if deadline is not None:
+                    deadline.unregister_query(athena, qid)
+        if state == "CANCELLED" and deadline is not None and deadline.expired():
+            raise DeadlineExceeded(f"Athena query {qid} cancelled at request deadline")
 
-    if state != "SUCCEEDED":
-        print(f"[athena:error] {result['QueryExecution']['Status']}")
-        return f"Error: Athena query failed with state '{state}'"
-    else:
-        print(f"[athena] succeeded qid={qid}")
+        if state != "SUCCEEDED":
+            print(f"[athena:error] {result['QueryExecution']['Status']}")
+            return f"Error: Athena query failed with state '{state}'"
+        else:
+            print(f"[athena] succeeded qid={qid}")
+            annotate_execution_stats(result)
 
-    # Parse the result set
-    data = athena.get_query_results(QueryExecutionId=qid)
-    rows = data["ResultSet"]["Rows"]
-    # Handle empty result sets gracefully
-    if not rows:
-        return []
-    first_row = rows[0].get("Data", [])
-    if not first_row:
-        return []
-    headers = [c.get("VarCharValue", f"col_{i}") for i, c in enumerate(first_row)]
-    results: list[dict] = []
-    for row in rows[1:]:
-        data_cells = row.get("Data", [])
-        item = {headers[i]: cell.get("VarCharValue", None) for i, cell in enumerate(data_cells)}
-        results.append(item)
-    return results
+        # Parse the result set
+        data = athena.get_query_results(QueryExecutionId=qid)
+        rows = data["ResultSet"]["Rows"]
+        # Handle empty result sets gracefully
+        if not rows:
+            return []
+        first_row = rows[0].get("Data", [])
+        if not first_row:
+            return []
+        headers = [c.get("VarCharValue", f"col_{i}") for i, c in enumerate(first_row)]
+        results: list[dict] = []
+        for row in rows[1:]:
+            data_cells = row.get("Data", [])
+            item = {headers[i]: cell.get("VarCharValue", None) for i, cell in enumerate(data_cells)}
+            results.append(item)
+        return results
 
 def _get_data_dictionary(table_name: str):
     """Get the data dictionary for a given Athena table."""
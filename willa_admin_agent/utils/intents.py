@@ -0,0 +1,136 @@
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, List, Optional, Tuple
+
+from willa_rest_api.services.boards import list_boards_service
+from willa_rest_api.services.metrics import MAX_RANGE_DAYS, get_cached_general_metrics, get_time_series_metrics
+from willa_rest_api.services.saves import list_saves_service
+from willa_rest_api.utils.deadline import DeadlineExceeded
+
+# Answer simple counts/recents straight from the REST services instead of running the LLM loop
+AGENT_FAST_PATH_ENABLED = os.getenv("AGENT_FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+RECENT_DEFAULT = 5
+RECENT_MAX = 20
+
+_ENTITY = r"(saves|boards|edges)"
+_COUNT = r"(?:how many|number of|count(?: of)?|total(?: number of)?)"
+_PERIOD = r"(today|yesterday|this week|last week|this month|(?:in )?the (?:last|past) (\d{1,4}) days|(?:last|past) (\d{1,4}) days)"
+_COUNT_TOTAL_RE = re.compile(
+    rf"^{_COUNT} (?:total )?{_ENTITY}(?: (?:are there|do we have|exist|are in the system))?(?: in total| total)?$"
+)
+_COUNT_PERIOD_RE = re.compile(
+    rf"^{_COUNT} (?:new )?{_ENTITY}(?: (?:were|have been|got))?(?: (?:created|added|made))? {_PERIOD}$"
+)
+_RECENT_RE = re.compile(
+    r"^(?:(?:show|list|get|give)(?: me)? |what are )?(?:the )?(?:(\d{1,2}) )?"
+    r"(?:latest|last|most recent|newest|recent)(?: (\d{1,2}))? (saves|boards)$"
+)
+
+
+def _normalize(message: str) -> str:
+    text = re.sub(r"\s+", " ", (message or "").strip().lower())
+    text = re.sub(r"^(?:please |can you |could you )+", "", text)
+    text = re.sub(r"[\s?.!]+$", "", text)
+    return re.sub(r",? please$", "", text)
+
+
+def _period_range(period: str, days_a: Optional[str], days_b: Optional[str], today: date) -> Tuple[date, date]:
+    if period == "today":
+        return today, today
+    if period == "yesterday":
+        return today - timedelta(days=1), today - timedelta(days=1)
+    if period == "this week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "last week":
+        monday = today - timedelta(days=today.weekday() + 7)
+        return monday, monday + timedelta(days=6)
+    if period == "this month":
+        return today.replace(day=1), today
+    days = max(1, min(int(days_a or days_b or 1), MAX_RANGE_DAYS))
+    return today - timedelta(days=days - 1), today
+
+
+def _cell(value: Any) -> str:
+    text = str(value if value is not None else "")
+    return text.replace("|", "\\|").replace("\n", " ").strip() or "—"
+
+
+def _table(headers: List[str], rows: List[List[Any]]) -> str:
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines += ["| " + " | ".join(_cell(v) for v in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _answer_count_total(entity: str) -> str:
+    metrics = get_cached_general_metrics()
+    total = int(metrics.get(f"total_{entity}") or 0)
+    return f"There are **{total:,}** {entity} in total (as of {metrics['computedAt'][:16].replace('T', ' ')} UTC)."
+
+
+def _answer_count_period(entity: str, period: str, start: date, end: date) -> str:
+    series = get_time_series_metrics(start=start.isoformat(), end=end.isoformat())[entity]
+    total = sum(int(point.get(f"total_{entity}") or 0) for point in series)
+    span = start.isoformat() if start == end else f"{start.isoformat()} to {end.isoformat()}"
+    label = f"in the last {(end - start).days + 1} days" if "days" in period else period
+    verb = "was" if total == 1 else "were"
+    noun = entity[:-1] if total == 1 else entity
+    return f"**{total:,}** {noun} {verb} created {label} ({span}, UTC)."
+
+
+def _answer_recent(entity: str, limit: int) -> str:
+    if entity == "saves":
+        items = list_saves_service(limit=limit)["items"]
+        headers = ["Title", "Publisher", "User", "Created"]
+        rows = [[i.get("title") or i.get("url"), i.get("publisher"), i.get("username"), i.get("createdat")] for i in items]
+    else:
+        items = list_boards_service(limit=limit)["items"]
+        headers = ["Name", "User", "Created"]
+        rows = [[i.get("name"), i.get("username"), i.get("createdat")] for i in items]
+    if not items:
+        return f"There are no {entity} yet."
+    return f"The {len(items)} most recent {entity}:\n\n" + _table(headers, rows)
+
+
+def match_intent(message: str, today: Optional[date] = None) -> Optional[Tuple[str, Callable[[], str]]]:
+    """
+    Match `message` against the fast-path intents. Returns (intent name, answer thunk) or None.
+    Only whole-message matches count, so anything with extra conditions goes to the LLM.
+    """
+    text = _normalize(message)
+    today = today or datetime.now(timezone.utc).date()
+    m = _COUNT_TOTAL_RE.match(text)
+    if m:
+        entity = m.group(1)
+        return "count_total", lambda: _answer_count_total(entity)
+    m = _COUNT_PERIOD_RE.match(text)
+    if m:
+        entity, period = m.group(1), m.group(2)
+        start, end = _period_range(period, m.group(3), m.group(4), today)
+        return "count_period", lambda: _answer_count_period(entity, period, start, end)
+    m = _RECENT_RE.match(text)
+    if m:
+        limit = max(1, min(int(m.group(1) or m.group(2) or RECENT_DEFAULT), RECENT_MAX))
+        entity = m.group(3)
+        return "recent", lambda: _answer_recent(entity, limit)
+    return None
+
+
+def answer_intent(message: str) -> Optional[Tuple[str, str]]:
+    """
+    Answer `message` deterministically when it matches a fast-path intent: (intent, markdown).
+    Returns None when nothing matches or the services fail, so the caller falls back to the agent.
+    """
+    if not AGENT_FAST_PATH_ENABLED:
+        return None
+    matched = match_intent(message)
+    if matched is None:
+        return None
+    intent, answer = matched
+    try:
+        return intent, answer()
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"[intent:error] intent={intent} err={e}")
+        return None
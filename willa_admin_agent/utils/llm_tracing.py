@@ -0,0 +1,65 @@
+import threading
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from willa_rest_api.utils.tracing import Span, begin_span
+
+
+def _token_usage(response: Any) -> Dict[str, int]:
+    """Prompt/completion token counts from an LLMResult (message usage metadata, else llm_output)."""
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {
+                    "inputTokens": int(usage.get("input_tokens") or 0),
+                    "outputTokens": int(usage.get("output_tokens") or 0),
+                }
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    return {
+        "inputTokens": int(usage.get("prompt_tokens") or 0),
+        "outputTokens": int(usage.get("completion_tokens") or 0),
+    }
+
+
+class LLMTraceCallbackHandler(BaseCallbackHandler):
+    """
+    Records each chat model call as an "llm" span with latency and token counts, and keeps
+    per-run totals that call_agent copies onto its root span.
+    """
+
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or (serialized or {}).get("name")
+        s = begin_span("llm", model=model, messages=sum(len(m) for m in messages or []))
+        if s is not None:
+            with self._lock:
+                self._spans[run_id] = s
+
+    def _pop(self, run_id: UUID) -> Optional[Span]:
+        with self._lock:
+            return self._spans.pop(run_id, None)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        s = self._pop(run_id)
+        usage = _token_usage(response)
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage["inputTokens"]
+            self.output_tokens += usage["outputTokens"]
+        if s is not None:
+            s.set(tokens=usage["inputTokens"] + usage["outputTokens"], **usage)
+            s.finish()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        s = self._pop(run_id)
+        if s is not None:
+            s.finish(error)
@@ -0,0 +1,282 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import boto3
+import tiktoken
+
+# Lambda spreads a connection's messages and its $disconnect over many containers, so the
+# deployed store must be shared: dynamodb (default) | sqlite | memory (single-container stand-ins)
+CHAT_MEMORY_BACKEND = os.getenv("CHAT_MEMORY_BACKEND", "dynamodb").lower()
+CHAT_MEMORY_TABLE = os.getenv("CHAT_MEMORY_TABLE", "willa-admin-conversations")
+CHAT_MEMORY_PATH = os.getenv("CHAT_MEMORY_PATH", "/tmp/willa_conversations.sqlite3")
+CHAT_MEMORY_TTL_S = float(os.getenv("CHAT_MEMORY_TTL_S", "86400"))
+# Token budget for prior turns replayed to the model (excludes the system prompt and new message)
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "6000"))
+# Per tool result, characters kept in the stored transcript
+CHAT_MEMORY_MAX_RESULT_CHARS = int(os.getenv("CHAT_MEMORY_MAX_RESULT_CHARS", "4000"))
+CHAT_MEMORY_MAX_TURNS = 50
+# DynamoDB items are capped at 400 KB; the oldest turns are dropped to stay under this
+_DYNAMODB_MAX_TURNS_BYTES = 350_000
+
+_ENCODING: Any = None
+_ENCODING_LOADED = False
+
+
+def _get_encoding():
+    # Loaded lazily: tiktoken may need to fetch the BPE file on first use
+    global _ENCODING, _ENCODING_LOADED
+    if not _ENCODING_LOADED:
+        try:
+            _ENCODING = tiktoken.encoding_for_model("gpt-4o-mini")
+        except Exception:
+            try:
+                _ENCODING = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                print(f"[memory:tiktoken:error] {e}")
+                _ENCODING = None
+        _ENCODING_LOADED = True
+    return _ENCODING
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        # Offline fallback: roughly four characters per token
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class MemoryConversationBackend:
+    """Conversations kept only for the lifetime of the container."""
+
+    def __init__(self):
+        self._data: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, connection_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._data.get(connection_id) or [])
+
+    def save(self, connection_id: str, turns: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._data[connection_id] = list(turns)
+
+    def delete(self, connection_id: str) -> None:
+        with self._lock:
+            self._data.pop(connection_id, None)
+
+
+class SQLiteConversationBackend:
+    """
+    Local SQLite stand-in for a shared conversation store (one JSON transcript per connection).
+    Container-local, so not for deployed use. Entries older than ttl_s are ignored and pruned.
+    """
+
+    def __init__(self, path: str = CHAT_MEMORY_PATH, ttl_s: float = CHAT_MEMORY_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "  connection_id TEXT PRIMARY KEY,"
+                "  turns TEXT NOT NULL,"
+                "  updated_at REAL NOT NULL"
+                ")"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def load(self, connection_id: str) -> List[Dict[str, Any]]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT turns, updated_at FROM conversations WHERE connection_id = ?",
+                (connection_id,),
+            ).fetchone()
+        if not row or time.time() - row[1] > self.ttl_s:
+            return []
+        try:
+            return json.loads(row[0]) or []
+        except Exception:
+            return []
+
+    def save(self, connection_id: str, turns: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO conversations (connection_id, turns, updated_at) VALUES (?, ?, ?)",
+                (connection_id, json.dumps(turns), now),
+            )
+            conn.execute("DELETE FROM conversations WHERE updated_at < ?", (now - self.ttl_s,))
+
+    def delete(self, connection_id: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM conversations WHERE connection_id = ?", (connection_id,))
+
+
+class DynamoDBConversationBackend:
+    """
+    Conversation store shared by every container: one item per connection with the transcript
+    as JSON. Table: hash key `connectionId` (S); `expiresAt` (epoch seconds) should be enabled
+    as the table's TTL attribute, and is also checked on read.
+    """
+
+    def __init__(self, table: str = CHAT_MEMORY_TABLE, ttl_s: float = CHAT_MEMORY_TTL_S, client: Any = None):
+        self.table = table
+        self.ttl_s = ttl_s
+        self._client = client or boto3.client("dynamodb")
+
+    def load(self, connection_id: str) -> List[Dict[str, Any]]:
+        item = self._client.get_item(
+            TableName=self.table,
+            Key={"connectionId": {"S": connection_id}},
+            ConsistentRead=True,
+        ).get("Item")
+        if not item or float(item.get("expiresAt", {}).get("N", 0)) < time.time():
+            return []
+        try:
+            return json.loads(item["turns"]["S"]) or []
+        except Exception:
+            return []
+
+    def save(self, connection_id: str, turns: List[Dict[str, Any]]) -> None:
+        body = json.dumps(turns)
+        while len(body.encode("utf-8")) > _DYNAMODB_MAX_TURNS_BYTES and len(turns) > 2:
+            turns = turns[2:]
+            body = json.dumps(turns)
+        now = time.time()
+        self._client.put_item(
+            TableName=self.table,
+            Item={
+                "connectionId": {"S": connection_id},
+                "turns": {"S": body},
+                "updatedAt": {"N": str(now)},
+                "expiresAt": {"N": str(int(now + self.ttl_s))},
+            },
+        )
+
+    def delete(self, connection_id: str) -> None:
+        self._client.delete_item(TableName=self.table, Key={"connectionId": {"S": connection_id}})
+
+
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_conversation_backend():
+    """
+    Return the configured backend (CHAT_MEMORY_BACKEND = dynamodb | sqlite | memory), created
+    once per container. Only dynamodb is shared between containers.
+    """
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            if CHAT_MEMORY_BACKEND == "memory":
+                _BACKEND = MemoryConversationBackend()
+            elif CHAT_MEMORY_BACKEND == "sqlite":
+                _BACKEND = SQLiteConversationBackend()
+            else:
+                _BACKEND = DynamoDBConversationBackend()
+        return _BACKEND
+
+
+def set_conversation_backend(backend) -> None:
+    """Swap in another backend (e.g. a shared store) exposing load/save/delete."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        _BACKEND = backend
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + " …[truncated]"
+
+
+def extract_tool_results(messages: List[Any]) -> List[Dict[str, Any]]:
+    """Pair the agent's tool calls with their ToolMessage results, in call order."""
+    calls: List[Dict[str, Any]] = []
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for msg in messages:
+        for tc in getattr(msg, "tool_calls", None) or []:
+            entry = {"tool": tc.get("name"), "args": tc.get("args") or {}, "result": ""}
+            calls.append(entry)
+            if tc.get("id"):
+                by_id[tc["id"]] = entry
+        tool_call_id = getattr(msg, "tool_call_id", None)
+        if tool_call_id and tool_call_id in by_id:
+            content = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, default=str)
+            by_id[tool_call_id]["result"] = _truncate(content, CHAT_MEMORY_MAX_RESULT_CHARS)
+    return calls
+
+
+def _render_turn(turn: Dict[str, Any], include_results: bool) -> Dict[str, str]:
+    if turn.get("role") != "assistant" or not turn.get("tools"):
+        return {"role": turn.get("role", "user"), "content": turn.get("content", "")}
+    lines = [turn.get("content", ""), "", "Tool calls already made for this answer (reuse instead of re-running):"]
+    for t in turn["tools"]:
+        args = json.dumps(t.get("args") or {}, default=str)
+        if include_results:
+            lines.append(f"- {t.get('tool')} {args} → {t.get('result', '')}")
+        else:
+            lines.append(f"- {t.get('tool')} {args} (result omitted)")
+    return {"role": "assistant", "content": "\n".join(lines)}
+
+
+def compact_history(turns: List[Dict[str, Any]], budget_tokens: int = CHAT_MEMORY_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    """
+    Render stored turns as chat messages within budget_tokens.
+    Newest turns are kept first; an older turn drops its tool results before being dropped entirely.
+    User/assistant pairs are kept together so the replay never starts with an orphan answer.
+    """
+    kept: List[Dict[str, str]] = []
+    used = 0
+    for turn in reversed(turns):
+        for include_results in (True, False):
+            rendered = _render_turn(turn, include_results)
+            cost = count_tokens(rendered["content"]) + 4
+            if used + cost <= budget_tokens:
+                kept.append(rendered)
+                used += cost
+                break
+        else:
+            break
+    kept.reverse()
+    while kept and kept[0]["role"] != "user":
+        kept.pop(0)
+    return kept
+
+
+def load_history(connection_id: Optional[str]) -> List[Dict[str, str]]:
+    if not connection_id:
+        return []
+    try:
+        return compact_history(get_conversation_backend().load(connection_id))
+    except Exception as e:
+        print(f"[memory:load:error] connection={connection_id} err={e}")
+        return []
+
+
+def record_turn(connection_id: Optional[str], message: str, answer: str, tools: List[Dict[str, Any]]) -> None:
+    if not connection_id:
+        return
+    try:
+        backend = get_conversation_backend()
+        turns = backend.load(connection_id)
+        turns.append({"role": "user", "content": message})
+        turns.append({"role": "assistant", "content": answer, "tools": tools})
+        backend.save(connection_id, turns[-CHAT_MEMORY_MAX_TURNS:])
+    except Exception as e:
+        print(f"[memory:save:error] connection={connection_id} err={e}")
+
+
+def clear_conversation(connection_id: Optional[str]) -> None:
+    if not connection_id:
+        return
+    try:
+        get_conversation_backend().delete(connection_id)
+    except Exception as e:
+        print(f"[memory:delete:error] connection={connection_id} err={e}")
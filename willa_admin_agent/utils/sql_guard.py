@@ -0,0 +1,221 @@
+import json
+import math
+import os
+import re
+from typing import List, Optional, Tuple
+
+from willa_admin_agent.utils.helpers import _run_athena_query
+from willa_rest_api.services.metrics import get_cached_general_metrics
+
+# Pre-flight limits for LLM-written SQL
+AGENT_MAX_ROWS = int(os.getenv("AGENT_MAX_ROWS", "200"))
+AGENT_SCAN_BUDGET_BYTES = int(os.getenv("AGENT_SCAN_BUDGET_BYTES", str(5 * 1024 ** 3)))
+AGENT_SQL_EXPLAIN = os.getenv("AGENT_SQL_EXPLAIN", "true").lower() in ("1", "true", "yes")
+# Rough bytes per row used when EXPLAIN has no size estimate and we fall back to cached row counts
+AGENT_EST_ROW_BYTES = int(os.getenv("AGENT_EST_ROW_BYTES", "2048"))
+
+READ_ONLY_LEADING = ("SELECT", "WITH")
+FORBIDDEN_KEYWORDS = (
+    "INSERT", "UPDATE", "DELETE", "MERGE", "ALTER", "DROP", "CREATE", "TRUNCATE",
+    "GRANT", "REVOKE", "MSCK", "UNLOAD", "CALL", "VACUUM", "OPTIMIZE", "PREPARE", "EXECUTE",
+)
+# Tables whose row counts we already cache via the general metrics
+_TABLE_METRIC_KEYS = {
+    "latest_entity_save": "total_saves",
+    "latest_entity_board": "total_boards",
+    "latest_entity_edge": "total_edges",
+}
+
+# Trailing row limit: LIMIT n | ALL, or FETCH FIRST|NEXT [n] ROW|ROWS ONLY|WITH TIES
+_LIMIT_RE = re.compile(
+    r"\b(?:LIMIT\s+(\d+|ALL)|FETCH\s+(?:FIRST|NEXT)\s+(\d+)?\s*ROWS?\s+(ONLY|WITH\s+TIES))\s*$",
+    re.IGNORECASE,
+)
+_AGGREGATE_RE = re.compile(r"\b(COUNT|SUM|AVG|MIN|MAX|APPROX_DISTINCT|COUNT_IF)\s*\(", re.IGNORECASE)
+# Clauses that make Athena read every row even when the result is limited or aggregated
+_FULL_READ_RE = re.compile(r"\b(GROUP\s+BY|ORDER\s+BY|DISTINCT|JOIN|OVER)\b", re.IGNORECASE)
+
+
+def _strip_comments(sql: str) -> str:
+    """Remove -- and /* */ comments that sit outside quoted literals and identifiers."""
+    out: List[str] = []
+    quote: Optional[str] = None
+    i = 0
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            out.append(ch)
+            if ch == quote:
+                if i + 1 < len(sql) and sql[i + 1] == quote:
+                    out.append(sql[i + 1])
+                    i += 1
+                else:
+                    quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+            out.append(ch)
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end < 0 else end
+            out.append(" ")
+            continue
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end < 0 else end + 2
+            out.append(" ")
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _mask_literals(sql: str) -> str:
+    """Replace the contents of '...' literals and "..." identifiers with spaces, keeping offsets."""
+    out: List[str] = []
+    quote: Optional[str] = None
+    i = 0
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            if ch == quote:
+                # Doubled quote is an escaped quote inside the literal
+                if i + 1 < len(sql) and sql[i + 1] == quote:
+                    out.append("  ")
+                    i += 2
+                    continue
+                quote = None
+                out.append(ch)
+            else:
+                out.append(" ")
+        else:
+            if ch in ("'", '"'):
+                quote = ch
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _top_level_limit(masked: str) -> Optional[re.Match]:
+    """Return the trailing LIMIT/FETCH match if it sits outside any parentheses."""
+    match = _LIMIT_RE.search(masked)
+    if not match:
+        return None
+    depth = 0
+    for ch in masked[: match.start()]:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+    return match if depth == 0 else None
+
+
+def _explain_scan_bytes(sql: str) -> Optional[float]:
+    """Estimated input bytes from EXPLAIN (TYPE IO); None when Athena gives no usable estimate."""
+    rows = _run_athena_query(f"EXPLAIN (TYPE IO, FORMAT JSON) {sql}")
+    if isinstance(rows, str) or not rows:
+        return None
+    try:
+        # Athena may split the JSON plan across several result rows
+        plan = json.loads("\n".join(str(next(iter(r.values()), None) or "") for r in rows) or "{}")
+    except Exception:
+        return None
+    if not isinstance(plan, dict):
+        return None
+    total = 0.0
+    for info in plan.get("inputTableColumnInfos") or []:
+        size = (info.get("estimate") or {}).get("outputSizeInBytes")
+        try:
+            size = float(size)
+        except (TypeError, ValueError):
+            return None
+        if math.isnan(size) or math.isinf(size):
+            return None
+        total += size
+    return total
+
+
+def _cached_stats_scan_bytes(masked: str) -> Optional[float]:
+    """
+    Rough bytes-scanned estimate from the cached general metrics row counts, used when EXPLAIN
+    has none: each referenced table read once in full. `masked` is the final statement (with its
+    top-level LIMIT). Only cross joins and unfiltered scans that must read every row are estimated.
+    Filtered queries, aggregate-only selects (e.g. COUNT(*)) and plain LIMITed selects, which stop
+    early, return None. Output size is bounded separately by the injected row limit.
+    """
+    referenced = [t for t in _TABLE_METRIC_KEYS if re.search(rf"\b{t}\b", masked, re.IGNORECASE)]
+    if not referenced:
+        return None
+    cross_join = re.search(r"\bCROSS\s+JOIN\b", masked, re.IGNORECASE) is not None
+    if not cross_join:
+        if re.search(r"\bWHERE\b", masked, re.IGNORECASE):
+            return None
+        if _FULL_READ_RE.search(masked) is None:
+            # A plain LIMITed select ends the scan early
+            return None
+        # Aggregates without GROUP BY (e.g. COUNT(*), COUNT(DISTINCT x)) read few columns
+        if _AGGREGATE_RE.search(masked) and not re.search(r"\bGROUP\s+BY\b", masked, re.IGNORECASE):
+            return None
+    try:
+        metrics = get_cached_general_metrics()
+    except Exception as e:
+        print(f"[sql_guard:stats:error] {e}")
+        return None
+    rows = [max(1, int(metrics.get(_TABLE_METRIC_KEYS[t]) or 0)) for t in referenced]
+    return float(sum(rows) * AGENT_EST_ROW_BYTES)
+
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if n < 1024 or unit == "TB":
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def preflight_sql(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Validate and rewrite agent SQL before it reaches Athena.
+    Returns (sql_to_run, None) or (None, "Error: ...") with guidance the model can act on.
+    - Only a single read-only SELECT/WITH statement is accepted.
+    - A top-level LIMIT is injected, or an existing LIMIT / FETCH FIRST is capped at AGENT_MAX_ROWS.
+    - Queries estimated to scan more than AGENT_SCAN_BUDGET_BYTES are refused.
+    """
+    sql = _strip_comments(query or "").strip().rstrip(";").strip()
+    if not sql:
+        return None, "Error: empty query."
+    masked = _mask_literals(sql)
+    if ";" in masked:
+        return None, "Error: only one SQL statement is allowed per call."
+    leading = masked.split(None, 1)[0].upper().lstrip("(")
+    if leading not in READ_ONLY_LEADING:
+        return None, "Error: only read-only SELECT or WITH queries are allowed."
+    for keyword in FORBIDDEN_KEYWORDS:
+        if re.search(rf"\b{keyword}\b", masked, re.IGNORECASE):
+            return None, f"Error: {keyword} is not allowed; queries must be read-only."
+
+    limit_match = _top_level_limit(masked)
+    if limit_match is None:
+        sql = f"{sql} LIMIT {AGENT_MAX_ROWS}"
+    elif limit_match.group(1) is not None:
+        value = limit_match.group(1)
+        if value.upper() == "ALL" or int(value) > AGENT_MAX_ROWS:
+            sql = f"{sql[: limit_match.start()]}LIMIT {AGENT_MAX_ROWS}"
+    else:
+        # FETCH FIRST defaults to one row; WITH TIES may return more than n, so it becomes ONLY
+        value = int(limit_match.group(2) or 1)
+        if value > AGENT_MAX_ROWS or limit_match.group(3).upper() != "ONLY":
+            sql = f"{sql[: limit_match.start()]}FETCH FIRST {min(value, AGENT_MAX_ROWS)} ROWS ONLY"
+
+    estimate: Optional[float] = None
+    if AGENT_SQL_EXPLAIN:
+        estimate = _explain_scan_bytes(sql)
+    if estimate is None:
+        estimate = _cached_stats_scan_bytes(_mask_literals(sql))
+    if estimate is not None and estimate > AGENT_SCAN_BUDGET_BYTES:
+        return None, (
+            f"Error: query would scan about {_format_bytes(estimate)}, over the "
+            f"{_format_bytes(AGENT_SCAN_BUDGET_BYTES)} budget. Add a selective WHERE filter "
+            "(e.g. on createdat or username), select fewer columns, or avoid cross joins, then retry."
+        )
+    return sql, None
@@ -0,0 +1,70 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+from langchain.agents.middleware import wrap_tool_call
+from langchain_core.messages import ToolMessage
+from willa_rest_api.utils.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from willa_rest_api.utils.tracing import begin_span, use_span
+
+# Tool calls emitted in the same model step are dispatched concurrently by the agent graph;
+# this pool bounds how many actually run at once.
+AGENT_TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
+AGENT_TOOL_TIMEOUT_S = float(os.getenv("AGENT_TOOL_TIMEOUT_S", "30"))
+
+_TOOL_POOL = ThreadPoolExecutor(max_workers=AGENT_TOOL_CONCURRENCY, thread_name_prefix="agent-tool")
+
+
+@wrap_tool_call
+def run_tool_with_timeout(request, handler):
+    """
+    Run one tool call on the bounded tool pool with a per-tool timeout.
+    The tool runs under a child deadline, so Athena queries it started are stopped when it times out.
+    A timeout comes back as an 'Error:' ToolMessage for that call only; sibling calls are unaffected
+    and their results are still merged in the order the model requested them.
+    Inside a sampled trace each call is recorded as a "tool" span with its arguments.
+    """
+    tool_call = request.tool_call
+    name = tool_call.get("name")
+    parent = current_deadline()
+    timeout_s = AGENT_TOOL_TIMEOUT_S
+    if parent is not None:
+        parent.check()
+        timeout_s = min(timeout_s, parent.remaining())
+    tool_deadline = parent.child(timeout_s) if parent is not None else Deadline.after(timeout_s)
+    tool_span = begin_span("tool", tool=name, args=tool_call.get("args") or {})
+
+    def run():
+        # Athena spans started by the tool nest under its span
+        with deadline_scope(tool_deadline), use_span(tool_span):
+            return handler(request)
+
+    future = _TOOL_POOL.submit(contextvars.copy_context().run, run)
+    try:
+        result = future.result(timeout=timeout_s)
+        if tool_span is not None:
+            tool_span.set(status=getattr(result, "status", None) or "success")
+            tool_span.finish()
+        return result
+    except FuturesTimeout:
+        tool_deadline.cancel()
+    except DeadlineExceeded as e:
+        # The whole request is out of time, not just this tool
+        if parent is not None and parent.expired():
+            if tool_span is not None:
+                tool_span.finish(e)
+            raise
+    except BaseException as e:
+        if tool_span is not None:
+            tool_span.finish(e)
+        raise
+    if tool_span is not None:
+        tool_span.set(status="timeout")
+        tool_span.finish()
+    print(f"[agent:tool:timeout] tool={name} after={timeout_s:.1f}s")
+    return ToolMessage(
+        content=f"Error: tool '{name}' timed out after {timeout_s:.1f}s. Try a narrower query.",
+        tool_call_id=tool_call.get("id"),
+        name=name,
+        status="error",
+    )
@@ -3,26 +3,37 @@ import os
 import boto3
 from dotenv import load_dotenv
 from willa_admin_agent.utils.helpers import _run_athena_query, _get_data_dictionary
+from willa_admin_agent.utils.sql_guard import preflight_sql
+from willa_rest_api.utils.cache import TTLCache
+from willa_rest_api.utils.deadline import DeadlineExceeded, current_deadline
+from willa_rest_api.utils.query import Query
+from willa_rest_api.utils.tracing import span
 
 load_dotenv()
 
 cognito = boto3.client("cognito-idp")
 
 ATHENA_DATABASE = os.getenv("ATHENA_DATABASE", "willa_datalake")
+# The table catalog rarely changes; keep it for the container's lifetime (bounded by a TTL)
+_SCHEMA_CACHE = TTLCache(ttl_s=float(os.getenv("SCHEMA_CACHE_TTL_S", "3600")), max_entries=8)
 
 # --- Define tools ---
 @tool("get_cognito_user_id_by_email", return_direct=False)
 def get_cognito_user_id_by_email(email: str, user_pool_id: str | None = None):
     """Return the Cognito userId (Username) for a given email address."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
     try:
         pool_id = user_pool_id or os.getenv("COGNITO_USER_POOL_ID")
         if not pool_id:
             return {"error": "Missing COGNITO_USER_POOL_ID. Set env var or pass user_pool_id."}
-        resp = cognito.list_users(
-            UserPoolId=pool_id,
-            Filter=f'email = "{email}"',
-            Limit=1,
-        )
+        with span("cognito.list_users", filter="email"):
+            resp = cognito.list_users(
+                UserPoolId=pool_id,
+                Filter=f'email = "{email}"',
+                Limit=1,
+            )
         users = resp.get("Users", [])
         if not users:
             return {"error": f"No user found for email {email}"}
@@ -40,15 +51,19 @@ def get_cognito_user_id_by_email(email: str, user_pool_id: str | None = None):
 @tool("get_cognito_user_id_by_sub", return_direct=False)
 def get_cognito_user_info_by_sub(sub: str, user_pool_id: str | None = None):
     """Return user's firstName, lastName, and email for a given Cognito sub (userId)."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
     try:
         pool_id = user_pool_id or os.getenv("COGNITO_USER_POOL_ID")
         if not pool_id:
             return {"error": "Missing COGNITO_USER_POOL_ID. Set env var or pass user_pool_id."}
-        resp = cognito.list_users(
-            UserPoolId=pool_id,
-            Filter=f'sub = "{sub}"',
-            Limit=1,
-        )
+        with span("cognito.list_users", filter="sub"):
+            resp = cognito.list_users(
+                UserPoolId=pool_id,
+                Filter=f'sub = "{sub}"',
+                Limit=1,
+            )
         users = resp.get("Users", [])
         if not users:
             return {"error": f"No user found for sub {sub}"}
@@ -63,18 +78,32 @@ def get_cognito_user_info_by_sub(sub: str, user_pool_id: str | None = None):
         print(f"[get_cognito_user_info_by_sub:error] {e}")
         return {"error": str(e)}
 
+def get_table_catalog():
+    """Return the cached 'latest_%' table list, querying information_schema on a miss."""
+    hit, tables = _SCHEMA_CACHE.get("tables")
+    if hit:
+        return tables
+    # Limit to tables prefixed with 'latest_' using information_schema for reliability
+    res = _run_athena_query(
+        Query(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = ? AND table_name LIKE ?",
+            [ATHENA_DATABASE, "latest_%"],
+        )
+    )
+    if isinstance(res, str) and res.startswith("Error"):
+        # Do not cache failures
+        print(f"[list_athena_tables:error] {res}")
+        return res
+    _SCHEMA_CACHE.set("tables", res)
+    return res
+
 @tool("list_athena_tables")
 def list_athena_tables():
     """List all available tables in the Athena database."""
-    # Limit to tables prefixed with 'latest_' using information_schema for reliability
     try:
-        res = _run_athena_query(
-            f"SELECT table_name FROM information_schema.tables "
-            f"WHERE table_schema = '{ATHENA_DATABASE}' AND table_name LIKE 'latest_%'"
-        )
-        if isinstance(res, str) and res.startswith("Error"):
-            print(f"[list_athena_tables:error] {res}")
-        return res
+        return get_table_catalog()
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"[list_athena_tables:error] {e}")
         return f"Error: {str(e)}"
@@ -102,6 +131,8 @@ def query_athena_sql(query: str):
     - When comparing dates, use `from_iso8601_timestamp()` in WHERE clauses, e.g.:
         WHERE from_iso8601_timestamp(createdat) > timestamp '2025-01-01 00:00:00'
     - Prefer LIMIT 50 for large queries.
+    - Only a single read-only SELECT/WITH query is accepted. LIMIT is capped, and queries
+      estimated to scan too much data are rejected with an 'Error:' explaining how to narrow them.
 
     Example:
         SELECT cast(from_iso8601_timestamp(createdat) as timestamp) AS created_at,
@@ -111,7 +142,13 @@ def query_athena_sql(query: str):
         LIMIT 10;
     """
     try:
-        return _run_athena_query(query)
+        sql, error = preflight_sql(query)
+        if error:
+            print(f"[query_athena_sql:preflight] {error}")
+            return error
+        return _run_athena_query(sql)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"[query_athena_sql:error] {e}")
         return f"Error: {str(e)}"
\ No newline at end of file
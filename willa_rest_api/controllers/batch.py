@@ -0,0 +1,101 @@
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from willa_rest_api.utils.deadline import DeadlineExceeded
+from willa_rest_api.utils.response import respond
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "10"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "6"))
+
+
+def _sub_event(sub: Dict[str, Any], parent: dict) -> dict:
+    """
+    Build the API Gateway event for one sub-request; `query` merges over any ?query in `path`.
+    Sub-responses are always plain JSON so they can be embedded; the batch response itself is
+    encoded as the client negotiated.
+    """
+    parts = urlsplit(str(sub.get("path") or ""))
+    params: Dict[str, str] = dict(parse_qsl(parts.query))
+    params.update({k: str(v) for k, v in (sub.get("query") or {}).items() if v is not None})
+    for key in ("format", "layout"):
+        params.pop(key, None)
+    headers = {k: v for k, v in ((parent or {}).get("headers") or {}).items() if k.lower() != "accept"}
+    return {
+        "httpMethod": "GET",
+        "path": parts.path,
+        "queryStringParameters": params or None,
+        "headers": headers,
+        "requestContext": (parent or {}).get("requestContext") or {},
+    }
+
+
+def _validate(payload: Any) -> Optional[str]:
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        return 'Body must be {"requests": [{"id", "path", "query"?}, ...]}'
+    requests = payload["requests"]
+    if not requests:
+        return "requests must not be empty"
+    if len(requests) > BATCH_MAX_REQUESTS:
+        return f"At most {BATCH_MAX_REQUESTS} requests per batch"
+    for i, sub in enumerate(requests):
+        if not isinstance(sub, dict) or not str(sub.get("path") or "").startswith("/"):
+            return f"requests[{i}] needs a path starting with '/'"
+        if str(sub.get("method") or "GET").upper() != "GET":
+            return f"requests[{i}]: only GET sub-requests are supported"
+        if urlsplit(sub["path"]).path.rstrip("/").endswith("/batch"):
+            return f"requests[{i}]: batches cannot be nested"
+        if sub.get("query") is not None and not isinstance(sub.get("query"), dict):
+            return f"requests[{i}].query must be an object"
+    return None
+
+
+def _run_sub(handle_rest, sub: Dict[str, Any], index: int, parent: dict) -> Dict[str, Any]:
+    sub_id = sub.get("id", index)
+    try:
+        response = handle_rest(_sub_event(sub, parent))
+    except DeadlineExceeded as e:
+        return {"id": sub_id, "status": 504, "body": {"error": str(e), "code": "deadline_exceeded"}}
+    except Exception as e:
+        return {"id": sub_id, "status": 500, "body": {"error": str(e)}}
+    body = response.get("body")
+    try:
+        body = json.loads(body) if isinstance(body, str) and body else body
+    except ValueError:
+        pass
+    return {"id": sub_id, "status": response.get("statusCode", 200), "body": body}
+
+
+def batch_controller(event: dict):
+    """
+    POST /batch: run several GET sub-requests through the normal routes concurrently in one invocation.
+    Body: {"requests": [{"id": "metrics", "path": "/metrics"},
+                        {"id": "saves", "path": "/saves", "query": {"limit": 20}}]}
+    Returns {"responses": [{"id", "status", "body"}, ...]} in request order. Sub-requests share
+    the invocation's deadline, caches and in-flight Athena executions, so identical work runs once.
+    """
+    # Imported here because the router itself dispatches to this controller
+    from willa_rest_api.router import handle_rest
+
+    raw = (event or {}).get("body") or ""
+    try:
+        payload = json.loads(raw) if raw else None
+    except ValueError:
+        payload = None
+    error = _validate(payload)
+    if error:
+        return respond(event, 400, {"message": error}, methods="GET,POST,OPTIONS")
+
+    requests: List[Dict[str, Any]] = payload["requests"]
+    workers = max(1, min(len(requests), BATCH_MAX_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        # Each sub-request inherits the request deadline and priority via its own context copy
+        futures = [
+            executor.submit(contextvars.copy_context().run, _run_sub, handle_rest, sub, i, event)
+            for i, sub in enumerate(requests)
+        ]
+        responses = [f.result() for f in futures]
+    return respond(event, 200, {"responses": responses}, methods="GET,POST,OPTIONS")
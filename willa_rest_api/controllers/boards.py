@@ -1,12 +1,19 @@
-import json
-from willa_rest_api.services.boards import list_boards_service, get_boards_count
+from willa_rest_api.utils.filters import parse_filter_params, BOARD_FILTER_FIELDS
+from willa_rest_api.services.boards import (
+    list_boards_service,
+    get_boards_count,
+    get_board_by_id,
+    list_board_saves_service,
+)
+from willa_rest_api.utils.response import respond
 
 
 def list_boards_controller(event: dict):
-    """List boards controller with limit/offset pagination."""
+    """List boards controller with nextToken cursor or limit/offset pagination and optional filters."""
     params = (event or {}).get("queryStringParameters") or {}
     limit_raw = params.get("limit")
     offset_raw = params.get("offset")
+    next_token = params.get("nextToken")
     try:
         limit = int(limit_raw) if limit_raw is not None else 20
     except Exception:
@@ -17,19 +24,45 @@ def list_boards_controller(event: dict):
         offset = 0
     if offset < 0:
         offset = 0
+    filters = parse_filter_params(params, BOARD_FILTER_FIELDS)
+    include_save_count = str(params.get("includeSaveCount") or "").lower() in ("true", "1", "yes")
 
-    result = list_boards_service(limit=limit, offset=offset)
-    total_count = get_boards_count()
+    result = list_boards_service(
+        limit=limit,
+        offset=offset,
+        filters=filters,
+        include_save_count=include_save_count,
+        prefetch_next=True,
+        next_token=next_token,
+    )
+    total_count = get_boards_count(filters=filters)
     result["totalCount"] = total_count
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-        },
-        "body": json.dumps(result),
-    }
+    return respond(event, 200, result)
 
 
+def get_board_by_id_controller(event: dict):
+    """Get single board by ID controller."""
+    path = (event or {}).get("path", "")
+    # Expect path .../boards/{id}
+    board_id = path.rstrip("/").split("/")[-1]
+    item = get_board_by_id(board_id)
+    if item is None:
+        return respond(event, 404, {"message": "Not found"})
+    return respond(event, 200, item)
+
+
+def list_board_saves_controller(event: dict):
+    """List saves on a board with limit and nextToken cursor pagination."""
+    path = (event or {}).get("path", "")
+    # Expect path .../boards/{id}/saves
+    board_id = path.rstrip("/").split("/")[-2]
+    params = (event or {}).get("queryStringParameters") or {}
+    limit_raw = params.get("limit")
+    next_token = params.get("nextToken")
+    try:
+        limit = int(limit_raw) if limit_raw is not None else 20
+    except Exception:
+        limit = 20
+
+    result = list_board_saves_service(board_id, limit=limit, next_token=next_token)
+    return respond(event, 200, result)
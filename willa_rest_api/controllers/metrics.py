@@ -1,40 +1,78 @@
-import json
-from willa_rest_api.services.metrics import get_general_metrics, get_time_series_metrics
+from willa_rest_api.services.metrics import (
+    get_cached_general_metrics,
+    get_time_series_metrics,
+    get_runtime_metrics,
+    get_metrics_summary,
+)
+from willa_rest_api.utils.response import respond
 
 
 def get_general_metrics_controller(event: dict):
-    """Controller returning general metrics counts."""
-    result = get_general_metrics()
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-        },
-        "body": json.dumps(result),
-    }
+    """Controller returning general metrics counts, served stale-while-revalidate."""
+    result = get_cached_general_metrics()
+    return respond(event, 200, result)
 
 
 def get_time_series_metrics_controller(event: dict):
-    """Controller returning time series counts for saves, boards, edges."""
+    """
+    Controller returning time series counts for saves, boards, edges.
+    Query params: days, from, to, granularity (hour|day|week|month),
+    variant (count|cumulative|moving_average), window.
+    """
     params = (event or {}).get("queryStringParameters") or {}
     days_raw = params.get("days")
+    window_raw = params.get("window")
     try:
         days = int(days_raw) if days_raw is not None else 30
     except Exception:
         days = 30
-    result = get_time_series_metrics(days=days)
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-        },
-        "body": json.dumps(result),
-    }
+    try:
+        window = int(window_raw) if window_raw is not None else 7
+    except Exception:
+        window = 7
+    result = get_time_series_metrics(
+        days=days,
+        granularity=params.get("granularity") or "day",
+        start=params.get("from"),
+        end=params.get("to"),
+        variant=params.get("variant") or "count",
+        window=window,
+    )
+    return respond(event, 200, result)
+
+
+def get_metrics_summary_controller(event: dict):
+    """
+    Controller returning the dashboard summary (totals, time series, archived vs active,
+    top publishers) from one Athena scan per table.
+    Query params: days, from, to, granularity (day|week|month), variant, window, top.
+    """
+    params = (event or {}).get("queryStringParameters") or {}
+    try:
+        days = int(params.get("days") or 30)
+    except Exception:
+        days = 30
+    try:
+        window = int(params.get("window") or 7)
+    except Exception:
+        window = 7
+    try:
+        top = int(params.get("top") or 10)
+    except Exception:
+        top = 10
+    result = get_metrics_summary(
+        days=days,
+        granularity=params.get("granularity") or "day",
+        start=params.get("from"),
+        end=params.get("to"),
+        variant=params.get("variant") or "count",
+        window=window,
+        top=top,
+    )
+    return respond(event, 200, result)
 
 
+def get_runtime_metrics_controller(event: dict):
+    """Controller returning Athena admission and prefetch stats for this container."""
+    result = get_runtime_metrics()
+    return respond(event, 200, result)
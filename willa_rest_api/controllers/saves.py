@@ -1,12 +1,14 @@
-import json
+from willa_rest_api.utils.filters import parse_filter_params, SAVE_FILTER_FIELDS
 from willa_rest_api.services.saves import list_saves_service, get_saves_count, get_save_by_id
+from willa_rest_api.utils.response import respond
 
 
 def list_saves_controller(event: dict):
-    """List saves controller."""
+    """List saves controller with nextToken cursor or limit/offset pagination and optional filters."""
     params = (event or {}).get("queryStringParameters") or {}
     limit_raw = params.get("limit")
     offset_raw = params.get("offset")
+    next_token = params.get("nextToken")
     try:
         limit = int(limit_raw) if limit_raw is not None else 20
     except Exception:
@@ -17,21 +19,15 @@ def list_saves_controller(event: dict):
         offset = 0
     if offset < 0:
         offset = 0
+    filters = parse_filter_params(params, SAVE_FILTER_FIELDS)
 
-    result = list_saves_service(limit=limit, offset=offset)
+    result = list_saves_service(
+        limit=limit, offset=offset, filters=filters, prefetch_next=True, next_token=next_token
+    )
     # Augment with overall total count for numeric pagination
-    total_count = get_saves_count()
+    total_count = get_saves_count(filters=filters)
     result["totalCount"] = total_count
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-        },
-        "body": json.dumps(result),
-    }
+    return respond(event, 200, result)
 
 
 def get_save_by_id_controller(event: dict):
@@ -41,23 +37,5 @@ def get_save_by_id_controller(event: dict):
     save_id = path.split("/")[-1]
     item = get_save_by_id(save_id)
     if item is None:
-        return {
-            "statusCode": 404,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "*",
-                "Access-Control-Allow-Methods": "GET,OPTIONS",
-            },
-            "body": json.dumps({"message": "Not found"}),
-        }
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-        },
-        "body": json.dumps(item),
-    }
\ No newline at end of file
+        return respond(event, 404, {"message": "Not found"})
+    return respond(event, 200, item)
\ No newline at end of file
@@ -1,5 +1,5 @@
-import json
 from willa_rest_api.services.users import list_users_service
+from willa_rest_api.utils.response import respond
 
 
 def list_users_controller(event: dict):
@@ -13,15 +13,6 @@ def list_users_controller(event: dict):
         limit = 20
 
     result = list_users_service(limit=limit, pagination_token=next_token)
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-        },
-        "body": json.dumps(result),
-    }
+    return respond(event, 200, result)
 
 
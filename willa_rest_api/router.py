@@ -0,0 +1,67 @@
+from willa_rest_api.controllers.saves import list_saves_controller, get_save_by_id_controller
+from willa_rest_api.controllers.metrics import (
+    get_general_metrics_controller,
+    get_time_series_metrics_controller,
+    get_runtime_metrics_controller,
+    get_metrics_summary_controller,
+)
+from willa_rest_api.controllers.boards import (
+    list_boards_controller,
+    get_board_by_id_controller,
+    list_board_saves_controller,
+)
+from willa_rest_api.controllers.users import list_users_controller
+from willa_rest_api.controllers.batch import batch_controller
+from willa_rest_api.utils.response import respond
+
+
+def handle_rest(event: dict):
+    """Route an API Gateway REST event to its controller."""
+    path = (event or {}).get("path", "")
+    method = (event or {}).get("httpMethod", "")
+    # CORS preflight (POST /batch sends a JSON body)
+    if method == "OPTIONS":
+        return {
+            "statusCode": 204,
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Headers": "*",
+                "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+            },
+            "body": "",
+        }
+    # POST /batch → run several GET sub-requests concurrently
+    if method == "POST" and path.endswith("/batch"):
+        return batch_controller(event)
+    # GET /boards/{id}/saves → saves on a board (must precede the /saves routes)
+    if method == "GET" and "/boards/" in path and path.endswith("/saves"):
+        return list_board_saves_controller(event)
+    # GET /boards/{id} → get single board by id
+    if method == "GET" and "/boards/" in path:
+        return get_board_by_id_controller(event)
+    # New: GET /saves → list_saves_controller handles query params and response
+    if method == "GET" and path.endswith("/saves"):
+        return list_saves_controller(event)
+    # GET /saves/{id} → get single save by id
+    if method == "GET" and "/saves/" in path:
+        return get_save_by_id_controller(event)
+    # GET /metrics → consolidated counts
+    if method == "GET" and path.endswith("/metrics"):
+        return get_general_metrics_controller(event)
+    # GET /metrics/timeseries → day-by-day counts
+    if method == "GET" and path.endswith("/metrics/timeseries"):
+        return get_time_series_metrics_controller(event)
+    # GET /metrics/summary → dashboard totals, series and breakdowns in one scan per table
+    if method == "GET" and path.endswith("/metrics/summary"):
+        return get_metrics_summary_controller(event)
+    # GET /metrics/runtime → Athena admission and prefetch stats
+    if method == "GET" and path.endswith("/metrics/runtime"):
+        return get_runtime_metrics_controller(event)
+    # GET /boards → list boards
+    if method == "GET" and path.endswith("/boards"):
+        return list_boards_controller(event)
+    # GET /users → list Cognito users
+    if method == "GET" and path.endswith("/users"):
+        return list_users_controller(event)
+    # Fallback hello for other routes/tests
+    return respond(event, 200, {"message": "hello world"})
@@ -1,52 +1,155 @@
-from willa_rest_api.utils.athena import run_athena_query
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from willa_rest_api.utils.athena import run_athena_query, run_cached_athena_query
+from willa_rest_api.utils.prefetch import PREFETCHER
+from willa_rest_api.utils.cache import TTLCache
+from willa_rest_api.utils.filters import compile_filters, BOARD_TEXT_COLUMNS
+from willa_rest_api.utils.hot_tier import get_hot_tier
+from willa_rest_api.utils.query import Query, select
+from willa_rest_api.services.saves import SAVE_COLUMNS, _encode_next_token, _decode_next_token
 
-def list_boards_service(limit: int = 20, offset: int = 0):
+# Per-container board -> save count index, rebuilt from one aggregate scan over edges
+BOARD_INDEX_TTL_S = float(os.getenv("BOARD_INDEX_TTL_S", "300"))
+_BOARD_INDEX_CACHE = TTLCache(ttl_s=BOARD_INDEX_TTL_S, max_entries=1)
+
+
+def _build_board_save_index() -> Dict[str, int]:
+    sql = (
+        "SELECT boardid, COUNT(1) AS save_count "
+        "FROM latest_entity_edge "
+        "WHERE NOT coalesce(isarchived, false) "
+        "GROUP BY boardid"
+    )
+    rows = run_athena_query(Query(sql)) or []
+    index: Dict[str, int] = {}
+    for r in rows:
+        board_id = r.get("boardid")
+        if not board_id:
+            continue
+        try:
+            index[board_id] = int(r.get("save_count") or 0)
+        except Exception:
+            index[board_id] = 0
+    return index
+
+
+def get_board_save_counts() -> Dict[str, int]:
     """
-    Return boards from 'latest_entity_board' in descending order by createdat using limit/offset pagination.
-    Uses row_number window to emulate OFFSET.
+    Return the board id -> active save count index, rebuilding it when older than BOARD_INDEX_TTL_S.
     """
-    # Sanitize inputs
-    try:
-        limit = int(limit)
-    except Exception:
-        limit = 20
-    limit = max(1, min(limit, 100))
-    try:
-        offset = int(offset)
-    except Exception:
-        offset = 0
-    offset = max(0, offset)
+    return _BOARD_INDEX_CACHE.get_or_compute("board_save_counts", _build_board_save_index)
 
+
+def _list_boards_query(
+    limit: int,
+    offset: int,
+    filters: Optional[Dict[str, Any]],
+    cursor: Optional[Tuple[str, str]] = None,
+) -> Query:
+    """
+    Query for one page plus a look-ahead row: a keyset query on (createdat, id) for the first
+    page and cursor pages, a row_number() window over the filtered rows for a bare offset.
+    """
     # Prefer explicit columns if known; safely default to all columns
     select_cols = "*"
     order_clause = "createdat DESC, id DESC"
+    if cursor or not offset:
+        where = compile_filters(filters, text_columns=BOARD_TEXT_COLUMNS, cursor=cursor)
+        return select("latest_entity_board", select_cols, where=where, order_by=order_clause, limit=limit + 1)
     start_row = offset
-    end_row = offset + limit
+    end_row = offset + limit + 1
+    where_clause, params = compile_filters(filters, text_columns=BOARD_TEXT_COLUMNS)
     sql = (
         "WITH ordered AS ("
         f"  SELECT {select_cols}, "
         f"         row_number() OVER (ORDER BY {order_clause}) AS rn "
-        f"  FROM latest_entity_board"
+        f"  FROM latest_entity_board "
+        f"  {where_clause}"
         ") "
         "SELECT * "
         "FROM ordered "
-        f"WHERE rn > {start_row} AND rn <= {end_row} "
+        "WHERE rn > ? AND rn <= ? "
         "ORDER BY rn"
     )
-    items = run_athena_query(sql)
-    return {
+    return Query(sql, [*params, start_row, end_row])
+
+
+def list_boards_service(
+    limit: int = 20,
+    offset: int = 0,
+    filters: Optional[Dict[str, Any]] = None,
+    include_save_count: bool = False,
+    prefetch_next: bool = False,
+    next_token: Optional[str] = None,
+):
+    """
+    Return boards from 'latest_entity_board' in descending order by createdat.
+    Pages with next_token (returned as nextToken while more rows exist) use keyset (createdat, id)
+    pagination; limit/offset still works, emulating OFFSET with a row_number window after filtering.
+    include_save_count annotates each board with `saveCount` from the cached board index.
+    prefetch_next speculatively loads the following page into the result cache.
+    Pages inside the hot tier's window are served locally when HOT_TIER_ENABLED.
+    """
+    # Sanitize inputs
+    try:
+        limit = int(limit)
+    except Exception:
+        limit = 20
+    limit = max(1, min(limit, 100))
+    try:
+        offset = int(offset)
+    except Exception:
+        offset = 0
+    offset = max(0, offset)
+    cursor = _decode_next_token(next_token) if next_token else None
+    if cursor:
+        offset = 0
+
+    hot_tier = get_hot_tier()
+    rows = hot_tier.list_page("boards", limit + 1, offset, filters, BOARD_TEXT_COLUMNS, cursor) if hot_tier else None
+    from_hot_tier = rows is not None
+    if from_hot_tier:
+        # Served locally; stop any prefetch for this listing so it frees its Athena slot
+        PREFETCHER.discard("boards")
+    else:
+        query = _list_boards_query(limit, offset, filters, cursor)
+        PREFETCHER.note_request("boards", query.fingerprint)
+        rows = run_cached_athena_query(query)
+    items = rows[:limit]
+    next_cursor = (items[-1].get("createdat") or "", items[-1].get("id") or "") if len(rows) > limit else None
+    if include_save_count:
+        counts = get_board_save_counts()
+        for item in items:
+            item["saveCount"] = counts.get(item.get("id"), 0)
+
+    # Start loading the page the client will ask for next: by token if it pages by token
+    if prefetch_next and not from_hot_tier and next_cursor:
+        if cursor:
+            next_query = _list_boards_query(limit, 0, filters, next_cursor)
+        else:
+            next_query = _list_boards_query(limit, offset + limit, filters)
+        PREFETCHER.schedule("boards", next_query.fingerprint, lambda: run_cached_athena_query(next_query))
+    out: Dict[str, Any] = {
         "items": items,
         "count": len(items),
         "limit": limit,
         "offset": offset,
+        "filters": filters or {},
     }
+    if next_cursor:
+        out["nextToken"] = _encode_next_token(*next_cursor)
+    return out
 
-def get_boards_count() -> int:
+def get_boards_count(filters: Optional[Dict[str, Any]] = None) -> int:
     """
-    Return the total count of rows in 'latest_entity_board'.
+    Return the count of rows in 'latest_entity_board', restricted by the same filters as the listing.
     """
-    sql = "SELECT COUNT(1) AS total FROM latest_entity_board"
-    rows = run_athena_query(sql)
+    hot_tier = get_hot_tier()
+    total = hot_tier.count("boards", filters, BOARD_TEXT_COLUMNS) if hot_tier else None
+    if total is not None:
+        return total
+    where = compile_filters(filters, text_columns=BOARD_TEXT_COLUMNS)
+    rows = run_cached_athena_query(select("latest_entity_board", "COUNT(1) AS total", where=where))
     if not rows:
         return 0
     # Athena returns strings; coerce safely
@@ -54,4 +157,69 @@ def get_boards_count() -> int:
     try:
         return int(total_str)
     except Exception:
-        return 0
\ No newline at end of file
+        return 0
+
+def get_board_by_id(board_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Return a single board by id from 'latest_entity_board', with its `saveCount`.
+    """
+    if not board_id:
+        return None
+    hot_tier = get_hot_tier()
+    board = hot_tier.get_by_id("boards", board_id) if hot_tier else None
+    if board is None:
+        rows = run_athena_query(select("latest_entity_board", where=("id = ?", [board_id]), limit=1))
+        if not rows:
+            return None
+        board = rows[0]
+    board["saveCount"] = get_board_save_counts().get(board_id, 0)
+    return board
+
+
+def list_board_saves_service(
+    board_id: str,
+    limit: int = 20,
+    next_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Return saves attached to a board, newest first, using keyset (createdat, id) cursor pagination.
+    Returns { items, count, limit, saveCount, nextToken? }.
+    """
+    try:
+        limit = int(limit)
+    except Exception:
+        limit = 20
+    limit = max(1, min(limit, 100))
+
+    clauses: List[str] = [
+        "id IN ("
+        "  SELECT saveid FROM latest_entity_edge "
+        "  WHERE boardid = ? AND NOT coalesce(isarchived, false)"
+        ")"
+    ]
+    params: List[Any] = [board_id]
+    cursor = _decode_next_token(next_token) if next_token else None
+    if cursor and cursor[0] and cursor[1]:
+        last_created_at, last_id = cursor
+        clauses.append("(createdat < ? OR (createdat = ? AND id < ?))")
+        params.extend([last_created_at, last_created_at, last_id])
+    # Fetch one extra row to know whether another page exists
+    query = select(
+        "latest_entity_save",
+        SAVE_COLUMNS,
+        where=(" AND ".join(clauses), params),
+        order_by="createdat DESC, id DESC",
+        limit=limit + 1,
+    )
+    rows = run_cached_athena_query(query)
+    items = rows[:limit]
+    out: Dict[str, Any] = {
+        "items": items,
+        "count": len(items),
+        "limit": limit,
+        "saveCount": get_board_save_counts().get(board_id, 0),
+    }
+    if len(rows) > limit and items:
+        last = items[-1]
+        out["nextToken"] = _encode_next_token(last.get("createdat") or "", last.get("id") or "")
+    return out
@@ -1,7 +1,55 @@
-from typing import Dict, List
-from datetime import datetime, timedelta, timezone
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 
-from willa_rest_api.utils.athena import run_athena_query
+import numpy as np
+
+from willa_rest_api.utils import timeseries as ts
+from willa_rest_api.utils.admission import CLASS_WORKGROUPS, SCHEDULER
+from willa_rest_api.utils.prefetch import PREFETCHER
+from willa_rest_api.utils.athena import DEFAULT_WORKGROUP, INFLIGHT_QUERIES, run_athena_query
+from willa_rest_api.utils.cache import StaleWhileRevalidateCache, TTLCache
+from willa_rest_api.utils.day_buckets import DayBucketStore
+from willa_rest_api.utils.query import Query
+
+# Dashboard totals tolerate minutes of staleness
+METRICS_SOFT_TTL_S = float(os.getenv("METRICS_SOFT_TTL_S", "120"))
+METRICS_HARD_TTL_S = float(os.getenv("METRICS_HARD_TTL_S", "900"))
+_GENERAL_METRICS_CACHE = StaleWhileRevalidateCache(METRICS_SOFT_TTL_S, METRICS_HARD_TTL_S)
+
+# Time series: entity key -> source table
+TIME_SERIES_ENTITIES = {
+    "saves": "latest_entity_save",
+    "boards": "latest_entity_board",
+    "edges": "latest_entity_edge",
+}
+MAX_RANGE_DAYS = 1825
+MAX_HOURLY_RANGE_DAYS = 14
+TIME_SERIES_TTL_S = float(os.getenv("TIME_SERIES_TTL_S", "300"))
+# Days at or after today minus this many days are still considered open and get refetched
+TIME_SERIES_LATE_DAYS = int(os.getenv("TIME_SERIES_LATE_DAYS", "1"))
+_DAY_BUCKETS = DayBucketStore(
+    late_arrival_days=TIME_SERIES_LATE_DAYS,
+    open_ttl_s=TIME_SERIES_TTL_S,
+    max_days=MAX_RANGE_DAYS,
+)
+_HOURLY_CACHE = TTLCache(ttl_s=TIME_SERIES_TTL_S, max_entries=32)
+
+# Dashboard summary: one grouped scan per table, cached per (range, top)
+SUMMARY_TTL_S = float(os.getenv("SUMMARY_TTL_S", "120"))
+SUMMARY_MAX_TOP = 50
+# Entities that carry a publisher column
+PUBLISHER_ENTITIES = ("saves",)
+_SUMMARY_CACHE = TTLCache(ttl_s=SUMMARY_TTL_S, max_entries=32)
+
+
+def _to_int(value: object) -> int:
+    try:
+        return int(value)  # type: ignore[arg-type]
+    except Exception:
+        return 0
 
 
 def get_general_metrics() -> Dict[str, int]:
@@ -15,95 +63,320 @@ def get_general_metrics() -> Dict[str, int]:
         "CROSS JOIN (SELECT COUNT(1) AS total_boards FROM latest_entity_board) b "
         "CROSS JOIN (SELECT COUNT(1) AS total_edges FROM latest_entity_edge) e"
     )
-    rows = run_athena_query(sql)
+    rows = run_athena_query(Query(sql))
     if not rows:
         return {"total_saves": 0, "total_boards": 0, "total_edges": 0}
     row = rows[0]
-    def to_int(value: object) -> int:
-        try:
-            return int(value)  # type: ignore[arg-type]
-        except Exception:
-            return 0
     return {
-        "total_saves": to_int(row.get("total_saves")),
-        "total_boards": to_int(row.get("total_boards")),
-        "total_edges": to_int(row.get("total_edges")),
+        "total_saves": _to_int(row.get("total_saves")),
+        "total_boards": _to_int(row.get("total_boards")),
+        "total_edges": _to_int(row.get("total_edges")),
     }
 
 
-def get_time_series_metrics(days: int = 30) -> Dict[str, list]:
+def get_cached_general_metrics() -> Dict[str, Any]:
+    """
+    Return general metrics from the stale-while-revalidate cache, plus `computedAt` (ISO-8601 UTC)
+    so callers can show freshness. Stale values trigger a background refresh.
+    """
+    metrics, computed_at = _GENERAL_METRICS_CACHE.get("general", get_general_metrics)
+    result: Dict[str, Any] = dict(metrics)
+    result["computedAt"] = datetime.fromtimestamp(computed_at, timezone.utc).isoformat()
+    return result
+
+
+def _normalize_day(v: object) -> str:
+    s = str(v or "")
+    # Athena returns 'YYYY-MM-DD HH:MM:SS.SSS' → slice date
+    return s[:10] if len(s) >= 10 else s
+
+
+def _fetch_daily_counts(entity: str, start: date, end: date) -> Dict[str, int]:
+    """
+    Query Athena for per-day counts of `entity` over [start, end] as {YYYY-MM-DD: count}.
+    createdat is bounded as a raw ISO string so the predicate stays prunable.
+    Always Athena, never the hot tier: the day-bucket store keeps closed days permanently, so
+    they must come from the source of truth.
+    """
+    table = TIME_SERIES_ENTITIES[entity]
+    sql = (
+        "SELECT date_trunc('day', from_iso8601_timestamp(createdat)) AS day, "
+        "       COUNT(1) AS total "
+        f"FROM {table} "
+        "WHERE createdat >= ? AND createdat < ? "
+        "GROUP BY 1 "
+        "ORDER BY 1"
+    )
+    rows = run_athena_query(Query(sql, [start.isoformat(), (end + timedelta(days=1)).isoformat()])) or []
+    counts: Dict[str, int] = {}
+    for r in rows:
+        try:
+            counts[_normalize_day(r.get("day"))] = int(r.get("total") or 0)
+        except Exception:
+            continue
+    return counts
+
+
+def get_daily_counts(entity: str, start: date, end: date) -> np.ndarray:
+    """
+    Return zero-filled per-day counts for [start, end] from the incremental day-bucket store.
+    Only days that are missing from the store, or still open (today and the late-arrival window),
+    are queried from Athena.
+    """
+    today = datetime.now(timezone.utc).date()
+    counts = _DAY_BUCKETS.get_counts(
+        entity,
+        start,
+        end,
+        today,
+        lambda run_start, run_end: _fetch_daily_counts(entity, run_start, run_end),
+    )
+    out = np.zeros((end - start).days + 1, dtype=np.int64)
+    out[: counts.size] = counts
+    return out
+
+
+def _fetch_hourly_counts(entity: str, start: date, end: date) -> Tuple[List[str], np.ndarray]:
+    table = TIME_SERIES_ENTITIES[entity]
+    sql = (
+        "SELECT date_trunc('hour', from_iso8601_timestamp(createdat)) AS hour, "
+        "       COUNT(1) AS total "
+        f"FROM {table} "
+        "WHERE createdat >= ? AND createdat < ? "
+        "GROUP BY 1 "
+        "ORDER BY 1"
+    )
+    rows = run_athena_query(Query(sql, [start.isoformat(), (end + timedelta(days=1)).isoformat()])) or []
+    hours = np.arange(
+        np.datetime64(start, "h"),
+        np.datetime64(end + timedelta(days=1), "h"),
+        dtype="datetime64[h]",
+    )
+    counts = np.zeros(hours.size, dtype=np.int64)
+    for r in rows:
+        raw = str(r.get("hour") or "")[:13].replace(" ", "T")
+        try:
+            i = int((np.datetime64(raw, "h") - hours[0]).astype(np.int64))
+        except Exception:
+            continue
+        if 0 <= i < counts.size:
+            counts[i] = int(r.get("total") or 0)
+    labels = [str(h).replace("T", " ") + ":00" for h in hours]
+    return labels, counts
+
+
+def _resolve_range(days: int, start: Optional[str], end: Optional[str], max_days: int) -> Tuple[date, date]:
+    """[start, end] from YYYY-MM-DD bounds, else the last `days` days ending today (UTC), capped to max_days."""
+    today = datetime.now(timezone.utc).date()
+    try:
+        end_day = date.fromisoformat(end) if end else today
+    except ValueError:
+        end_day = today
+    try:
+        start_day = date.fromisoformat(start) if start else end_day - timedelta(days=days - 1)
+    except ValueError:
+        start_day = end_day - timedelta(days=days - 1)
+    if start_day > end_day:
+        start_day, end_day = end_day, start_day
+    return max(start_day, end_day - timedelta(days=max_days - 1)), end_day
+
+
+def get_time_series_metrics(
+    days: int = 30,
+    granularity: str = "day",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    variant: str = "count",
+    window: int = 7,
+) -> Dict[str, list]:
     """
-    Return day-by-day counts for the last `days` days for saves, boards, and edges.
-    Uses createdat timestamp, truncated to day.
-    Output example:
+    Return bucketed counts for saves, boards, and edges.
+    - Range is [start, end] (YYYY-MM-DD, UTC) when given, otherwise the last `days` days.
+    - granularity: hour | day | week | month. Week buckets start on Monday; labels are the bucket start.
+    - variant: count | cumulative | moving_average (trailing `window` buckets).
+    Day/week/month are re-aggregated in NumPy from the incremental daily bucket store, so changing
+    granularity or variant does not query Athena again and closed days are never rescanned. Hour buckets need their own hourly rollup
+    and are limited to MAX_HOURLY_RANGE_DAYS.
+    Output example (day granularity):
       {
         "saves":  [ { "day": "2025-10-01", "total_saves": 23 }, ... ],
         "boards": [ { "day": "2025-10-01", "total_boards": 5 }, ... ],
         "edges":  [ { "day": "2025-10-01", "total_edges": 12 }, ... ]
       }
+    Other granularities use the granularity name ("hour", "week", "month") as the label key.
     """
     try:
         days = int(days)
     except Exception:
         days = 30
-    days = max(1, min(days, 365))
-
-    def normalize_day(v: object) -> str:
-        s = str(v or "")
-        # Athena returns 'YYYY-MM-DD HH:MM:SS.SSS' → slice date
-        return s[:10] if len(s) >= 10 else s
-
-    # Build complete day range to ensure zero-filled results
-    now = datetime.now(timezone.utc)
-    # Oldest first: [D-(days-1), ..., D]
-    day_keys: List[str] = []
-    for i in range(days):
-      d = now - timedelta(days=(days - 1 - i))
-      day_keys.append(d.strftime('%Y-%m-%d'))
-
-    # Saves
-    sql_saves = (
-        "SELECT date_trunc('day', from_iso8601_timestamp(createdat)) AS day, "
-        "       COUNT(1) AS total_saves "
-        "FROM latest_entity_save "
-        f"WHERE from_iso8601_timestamp(createdat) >= date_add('day', -{days}, current_timestamp) "
-        "GROUP BY 1 "
-        "ORDER BY 1"
-    )
-    rows_saves = run_athena_query(sql_saves) or []
-    saves_map = {normalize_day(r.get("day")): int(r.get("total_saves") or 0) for r in rows_saves}
-    saves_series = [{"day": dk, "total_saves": int(saves_map.get(dk, 0))} for dk in day_keys]
+    days = max(1, min(days, MAX_RANGE_DAYS))
+    if granularity not in ts.GRANULARITIES:
+        granularity = "day"
+    if variant not in ts.VARIANTS:
+        variant = "count"
 
-    # Boards
-    sql_boards = (
-        "SELECT date_trunc('day', from_iso8601_timestamp(createdat)) AS day, "
-        "       COUNT(1) AS total_boards "
-        "FROM latest_entity_board "
-        f"WHERE from_iso8601_timestamp(createdat) >= date_add('day', -{days}, current_timestamp) "
-        "GROUP BY 1 "
-        "ORDER BY 1"
+    max_days = MAX_HOURLY_RANGE_DAYS if granularity == "hour" else MAX_RANGE_DAYS
+    start_day, end_day = _resolve_range(days, start, end, max_days)
+
+    out: Dict[str, list] = {}
+    for entity in TIME_SERIES_ENTITIES:
+        value_key = f"total_{entity}"
+        if granularity == "hour":
+            labels, counts = _HOURLY_CACHE.get_or_compute(
+                (entity, start_day, end_day),
+                lambda e=entity: _fetch_hourly_counts(e, start_day, end_day),
+            )
+        else:
+            daily = get_daily_counts(entity, start_day, end_day)
+            day_keys = ts.day_range(np.datetime64(start_day), np.datetime64(end_day))
+            buckets, counts = ts.rebucket(day_keys, daily, granularity)
+            labels = [str(b) for b in buckets]
+        values = ts.apply_variant(counts, variant, window)
+        out[entity] = ts.to_series(labels, values, granularity, value_key)
+    return out
+
+
+def _summary_query(entity: str, start: date, end: date, top: int) -> Query:
+    """
+    One scan of the entity table grouped by GROUPING SETS: the grand total (with archived count),
+    per-day counts for [start, end] and, for PUBLISHER_ENTITIES, the top publishers.
+    Rows outside the range fall into a NULL day group that is filtered out.
+    """
+    table = TIME_SERIES_ENTITIES[entity]
+    day = (
+        "CASE WHEN createdat >= ? AND createdat < ? "
+        "THEN date_trunc('day', from_iso8601_timestamp(createdat)) END"
     )
-    rows_boards = run_athena_query(sql_boards) or []
-    boards_map = {normalize_day(r.get("day")): int(r.get("total_boards") or 0) for r in rows_boards}
-    boards_series = [{"day": dk, "total_boards": int(boards_map.get(dk, 0))} for dk in day_keys]
+    if entity in PUBLISHER_ENTITIES:
+        grp = "CASE grouping(day, publisher) WHEN 3 THEN 'total' WHEN 1 THEN 'day' ELSE 'publisher' END"
+        publisher = "publisher"
+        sets = "GROUPING SETS ((), (day), (publisher))"
+    else:
+        grp = "CASE grouping(day) WHEN 1 THEN 'total' ELSE 'day' END"
+        publisher = "CAST(NULL AS varchar)"
+        sets = "GROUPING SETS ((), (day))"
+    inner_publisher = "publisher, " if entity in PUBLISHER_ENTITIES else ""
+    sql = (
+        "SELECT grp, day, publisher, total, archived FROM ("
+        f"  SELECT {grp} AS grp, day, {publisher} AS publisher, "
+        "         COUNT(1) AS total, COUNT_IF(archived) AS archived, "
+        f"         row_number() OVER (PARTITION BY {grp}, {publisher} IS NULL ORDER BY COUNT(1) DESC) AS rnk "
+        f"  FROM (SELECT {day} AS day, {inner_publisher}coalesce(isarchived, false) AS archived FROM {table}) t "
+        f"  GROUP BY {sets}"
+        ") g "
+        "WHERE grp = 'total' "
+        "   OR (grp = 'day' AND day IS NOT NULL) "
+        "   OR (grp = 'publisher' AND publisher IS NOT NULL AND rnk <= ?)"
+    )
+    return Query(sql, [start.isoformat(), (end + timedelta(days=1)).isoformat(), top])
 
-    # Edges
-    sql_edges = (
-        "SELECT date_trunc('day', from_iso8601_timestamp(createdat)) AS day, "
-        "       COUNT(1) AS total_edges "
-        "FROM latest_entity_edge "
-        f"WHERE from_iso8601_timestamp(createdat) >= date_add('day', -{days}, current_timestamp) "
-        "GROUP BY 1 "
-        "ORDER BY 1"
+
+def _fetch_entity_summary(entity: str, start: date, end: date, top: int) -> Dict[str, Any]:
+    rows = run_athena_query(_summary_query(entity, start, end, top)) or []
+    out: Dict[str, Any] = {"total": 0, "archived": 0, "daily": {}, "publishers": []}
+    for r in rows:
+        grp = r.get("grp")
+        if grp == "total":
+            out["total"] = _to_int(r.get("total"))
+            out["archived"] = _to_int(r.get("archived"))
+        elif grp == "day":
+            out["daily"][_normalize_day(r.get("day"))] = _to_int(r.get("total"))
+        elif grp == "publisher":
+            out["publishers"].append({"publisher": r.get("publisher"), f"total_{entity}": _to_int(r.get("total"))})
+    out["publishers"].sort(key=lambda p: p[f"total_{entity}"], reverse=True)
+    return out
+
+
+def _fetch_summaries(start: date, end: date, top: int) -> Tuple[Dict[str, Dict[str, Any]], float]:
+    """
+    Run the per-table summary scans concurrently, then prime the general-metrics cache and the
+    day-bucket store with their by-products so /metrics and /metrics/timeseries do not rescan.
+    """
+    with ThreadPoolExecutor(max_workers=len(TIME_SERIES_ENTITIES), thread_name_prefix="summary") as executor:
+        futures = {
+            entity: executor.submit(contextvars.copy_context().run, _fetch_entity_summary, entity, start, end, top)
+            for entity in TIME_SERIES_ENTITIES
+        }
+        summaries = {entity: f.result() for entity, f in futures.items()}
+    computed_at = _GENERAL_METRICS_CACHE.put(
+        "general", {f"total_{entity}": s["total"] for entity, s in summaries.items()}
     )
-    rows_edges = run_athena_query(sql_edges) or []
-    edges_map = {normalize_day(r.get("day")): int(r.get("total_edges") or 0) for r in rows_edges}
-    edges_series = [{"day": dk, "total_edges": int(edges_map.get(dk, 0))} for dk in day_keys]
+    today = datetime.now(timezone.utc).date()
+    for entity, s in summaries.items():
+        # Only days the store is missing (or still open) are taken from the scan
+        _DAY_BUCKETS.get_counts(entity, start, end, today, lambda _s, _e, daily=s["daily"]: daily)
+    return summaries, computed_at
+
+
+def get_metrics_summary(
+    days: int = 30,
+    granularity: str = "day",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    variant: str = "count",
+    window: int = 7,
+    top: int = 10,
+) -> Dict[str, Any]:
+    """
+    Return everything the dashboard needs from one Athena statement per table:
+      {
+        "general":    { "total_saves": ..., "total_boards": ..., "total_edges": ..., "computedAt": ... },
+        "timeseries": { "saves": [ { "day": "2025-10-01", "total_saves": 23 }, ... ], ... },
+        "archived":   { "saves": { "archived": 4, "active": 19 }, ... },
+        "topPublishers": [ { "publisher": "nytimes.com", "total_saves": 120 }, ... ],
+        "from": "2025-09-02", "to": "2025-10-01"
+      }
+    general and timeseries match /metrics and /metrics/timeseries. Range, granularity (day|week|month)
+    and variant behave as in get_time_series_metrics; hour buckets are not available here.
+    """
+    try:
+        days = int(days)
+    except Exception:
+        days = 30
+    days = max(1, min(days, MAX_RANGE_DAYS))
+    try:
+        top = max(1, min(int(top), SUMMARY_MAX_TOP))
+    except Exception:
+        top = 10
+    if granularity not in ts.GRANULARITIES or granularity == "hour":
+        granularity = "day"
+    if variant not in ts.VARIANTS:
+        variant = "count"
+    start_day, end_day = _resolve_range(days, start, end, MAX_RANGE_DAYS)
 
+    summaries, computed_at = _SUMMARY_CACHE.get_or_compute(
+        (start_day, end_day, top), lambda: _fetch_summaries(start_day, end_day, top)
+    )
+    general: Dict[str, Any] = {f"total_{entity}": s["total"] for entity, s in summaries.items()}
+    general["computedAt"] = datetime.fromtimestamp(computed_at, timezone.utc).isoformat()
+    day_keys = ts.day_range(np.datetime64(start_day), np.datetime64(end_day))
+    timeseries: Dict[str, list] = {}
+    archived: Dict[str, Dict[str, int]] = {}
+    for entity, s in summaries.items():
+        daily = np.array([s["daily"].get(str(d), 0) for d in day_keys], dtype=np.int64)
+        buckets, counts = ts.rebucket(day_keys, daily, granularity)
+        values = ts.apply_variant(counts, variant, window)
+        timeseries[entity] = ts.to_series([str(b) for b in buckets], values, granularity, f"total_{entity}")
+        archived[entity] = {"archived": s["archived"], "active": s["total"] - s["archived"]}
     return {
-        "saves": saves_series,
-        "boards": boards_series,
-        "edges": edges_series,
+        "general": general,
+        "timeseries": timeseries,
+        "archived": archived,
+        "topPublishers": [p for entity in PUBLISHER_ENTITIES for p in summaries[entity]["publishers"]],
+        "from": start_day.isoformat(),
+        "to": end_day.isoformat(),
     }
 
 
+def get_runtime_metrics() -> Dict[str, Any]:
+    """
+    Return runtime stats for the container serving this request (not the fleet): Athena
+    admission queue depth, in-flight count and wait times per priority class, how many
+    executions were shared by identical concurrent queries, the workgroup each class runs in,
+    plus next-page prefetch counters and hit rate.
+    """
+    athena = SCHEDULER.stats()
+    athena["scope"] = "container"
+    athena["classWorkgroups"] = {p: wg or DEFAULT_WORKGROUP for p, wg in CLASS_WORKGROUPS.items()}
+    athena["singleFlight"] = INFLIGHT_QUERIES.stats()
+    return {"athena": athena, "prefetch": PREFETCHER.stats()}
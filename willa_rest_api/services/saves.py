@@ -1,7 +1,28 @@
 import json
 import base64
 from typing import Any, Dict, List, Optional, Tuple
-from willa_rest_api.utils.athena import run_athena_query
+from willa_rest_api.utils.athena import run_athena_query, run_cached_athena_query
+from willa_rest_api.utils.prefetch import PREFETCHER
+from willa_rest_api.utils.filters import compile_filters, SAVE_TEXT_COLUMNS
+from willa_rest_api.utils.hot_tier import get_hot_tier
+from willa_rest_api.utils.query import Query, select
+
+# Explicitly list columns to keep payload tight and ordered
+SAVE_COLUMNS = [
+    "id",
+    "url",
+    "title",
+    "description",
+    "comments",
+    "image",
+    "imagekey",
+    "publisher",
+    "boardids",
+    "createdat",
+    "updatedat",
+    "username",
+    "isarchived",
+]
 
 def _encode_next_token(last_created_at: str, last_id: str) -> str:
     payload = {"createdat": last_created_at, "id": last_id}
@@ -17,9 +38,55 @@ def _decode_next_token(token: str) -> Optional[Tuple[str, str]]:
         return None
 
 
-def list_saves_service(limit: int = 20, offset: Optional[int] = 0) -> Dict[str, Any]:
+def _list_saves_query(
+    limit: int,
+    offset: int,
+    filters: Optional[Dict[str, Any]],
+    cursor: Optional[Tuple[str, str]] = None,
+) -> Query:
     """
-    Return saves from 'latest_entity_save' in descending order by createdat using limit/offset pagination.
+    Query for one page plus a look-ahead row. The first page and cursor pages are keyset
+    queries on (createdat, id), so Athena only keeps the top rows of the matching set;
+    a bare offset falls back to a row_number() window over the filtered rows.
+    """
+    order_clause = "createdat DESC, id DESC"
+    if cursor or not offset:
+        where = compile_filters(filters, text_columns=SAVE_TEXT_COLUMNS, cursor=cursor)
+        return select("latest_entity_save", SAVE_COLUMNS, where=where, order_by=order_clause, limit=limit + 1)
+    # Athena does not support OFFSET directly; emulate with row_number() window
+    select_cols = ", ".join(SAVE_COLUMNS)
+    start_row = offset
+    end_row = offset + limit + 1
+    where_clause, params = compile_filters(filters, text_columns=SAVE_TEXT_COLUMNS)
+    sql = (
+        "WITH ordered AS ("
+        f"  SELECT {select_cols}, "
+        f"         row_number() OVER (ORDER BY {order_clause}) AS rn "
+        f"  FROM latest_entity_save "
+        f"  {where_clause}"
+        ") "
+        f"SELECT {select_cols} "
+        "FROM ordered "
+        "WHERE rn > ? AND rn <= ? "
+        "ORDER BY rn"
+    )
+    return Query(sql, [*params, start_row, end_row])
+
+
+def list_saves_service(
+    limit: int = 20,
+    offset: Optional[int] = 0,
+    filters: Optional[Dict[str, Any]] = None,
+    prefetch_next: bool = False,
+    next_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Return saves from 'latest_entity_save' in descending order by createdat.
+    Pages with next_token (returned as nextToken while more rows exist) use keyset (createdat, id)
+    pagination; limit/offset still works, but deep offsets rank the whole filtered set.
+    Optional filters (see utils.filters) are applied in the WHERE clause.
+    prefetch_next speculatively loads the following page into the result cache.
+    Pages inside the hot tier's window are served locally when HOT_TIER_ENABLED.
     """
     # Sanitize limit
     if not isinstance(limit, int):
@@ -36,56 +103,53 @@ def list_saves_service(limit: int = 20, offset: Optional[int] = 0) -> Dict[str,
         except Exception:
             offset = 0
     offset = max(0, offset)
+    cursor = _decode_next_token(next_token) if next_token else None
+    if cursor:
+        offset = 0
 
-    # Explicitly list columns to keep payload tight and ordered
-    columns = [
-        "id",
-        "url",
-        "title",
-        "description",
-        "comments",
-        "image",
-        "imagekey",
-        "publisher",
-        "boardids",
-        "createdat",
-        "updatedat",
-        "username",
-        "isarchived",
-    ]
-    # Athena does not support OFFSET directly; emulate with row_number() window
-    select_cols = ", ".join(columns)
-    order_clause = "createdat DESC, id DESC"
-    start_row = offset
-    end_row = offset + limit
-    sql = (
-        "WITH ordered AS ("
-        f"  SELECT {select_cols}, "
-        f"         row_number() OVER (ORDER BY {order_clause}) AS rn "
-        f"  FROM latest_entity_save"
-        ") "
-        f"SELECT {select_cols} "
-        "FROM ordered "
-        f"WHERE rn > {start_row} AND rn <= {end_row} "
-        "ORDER BY rn"
-    )
+    hot_tier = get_hot_tier()
+    rows = hot_tier.list_page("saves", limit + 1, offset, filters, SAVE_TEXT_COLUMNS, cursor) if hot_tier else None
+    from_hot_tier = rows is not None
+    if from_hot_tier:
+        # Served locally; stop any prefetch for this listing so it frees its Athena slot
+        PREFETCHER.discard("saves")
+    else:
+        query = _list_saves_query(limit, offset, filters, cursor)
+        PREFETCHER.note_request("saves", query.fingerprint)
+        rows = run_cached_athena_query(query)
+    items = rows[:limit]
+    next_cursor = (items[-1].get("createdat") or "", items[-1].get("id") or "") if len(rows) > limit else None
 
-    items = run_athena_query(sql)
+    # Start loading the page the client will ask for next: by token if it pages by token
+    if prefetch_next and not from_hot_tier and next_cursor:
+        if cursor:
+            next_query = _list_saves_query(limit, 0, filters, next_cursor)
+        else:
+            next_query = _list_saves_query(limit, offset + limit, filters)
+        PREFETCHER.schedule("saves", next_query.fingerprint, lambda: run_cached_athena_query(next_query))
 
-    return {
+    out: Dict[str, Any] = {
         "items": items,
         "count": len(items),
         "limit": limit,
         "offset": offset,
+        "filters": filters or {},
     }
+    if next_cursor:
+        out["nextToken"] = _encode_next_token(*next_cursor)
+    return out
 
 
-def get_saves_count() -> int:
+def get_saves_count(filters: Optional[Dict[str, Any]] = None) -> int:
     """
-    Return the total count of rows in 'latest_entity_save'.
+    Return the count of rows in 'latest_entity_save', restricted by the same filters as the listing.
     """
-    sql = "SELECT COUNT(1) AS total FROM latest_entity_save"
-    rows = run_athena_query(sql)
+    hot_tier = get_hot_tier()
+    total = hot_tier.count("saves", filters, SAVE_TEXT_COLUMNS) if hot_tier else None
+    if total is not None:
+        return total
+    where = compile_filters(filters, text_columns=SAVE_TEXT_COLUMNS)
+    rows = run_cached_athena_query(select("latest_entity_save", "COUNT(1) AS total", where=where))
     if not rows:
         return 0
     # Athena returns strings; coerce safely
@@ -102,26 +166,11 @@ def get_save_by_id(save_id: str) -> Optional[Dict[str, Any]]:
     """
     if not save_id:
         return None
-    columns = [
-        "id",
-        "url",
-        "title",
-        "description",
-        "comments",
-        "image",
-        "imagekey",
-        "publisher",
-        "boardids",
-        "createdat",
-        "updatedat",
-        "username",
-        "isarchived",
-    ]
-    select_cols = ", ".join(columns)
-    # Athena uses single quotes for string literals
-    escaped_id = save_id.replace("'", "''")
-    sql = f"SELECT {select_cols} FROM latest_entity_save WHERE id = '{escaped_id}' LIMIT 1"
-    rows = run_athena_query(sql)
+    hot_tier = get_hot_tier()
+    item = hot_tier.get_by_id("saves", save_id) if hot_tier else None
+    if item is not None:
+        return item
+    rows = run_athena_query(select("latest_entity_save", SAVE_COLUMNS, where=("id = ?", [save_id]), limit=1))
     if not rows:
         return None
     return rows[0]
\ No newline at end of file
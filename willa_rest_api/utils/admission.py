@@ -0,0 +1,158 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from willa_rest_api.utils.deadline import Deadline, DeadlineExceeded
+
+# Lower rank is admitted first: interactive REST > agent > export
+PRIORITY_CLASSES = {"interactive": 0, "agent": 1, "export": 2}
+DEFAULT_PRIORITY = "interactive"
+ATHENA_MAX_INFLIGHT = int(os.getenv("ATHENA_MAX_INFLIGHT", "4"))
+# Every ADMISSION_AGING_S seconds spent waiting promotes a query by one priority class,
+# so exports are delayed under load but never starved
+ADMISSION_AGING_S = float(os.getenv("ADMISSION_AGING_S", "10"))
+# Isolation across invocations: each class may run in its own Athena workgroup (give the
+# interactive one its own capacity reservation) via ATHENA_WORKGROUP_<CLASS>; unset classes use
+# the caller's default workgroup
+CLASS_WORKGROUPS = {p: os.getenv(f"ATHENA_WORKGROUP_{p.upper()}", "") for p in PRIORITY_CLASSES}
+
+_current_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "willa_query_priority", default=DEFAULT_PRIORITY
+)
+
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+
+def workgroup_for(priority: Optional[str], default: str) -> str:
+    """Athena workgroup that queries of this priority class run in."""
+    return CLASS_WORKGROUPS.get(priority or current_priority()) or default
+
+
+@contextmanager
+def query_priority(priority: str) -> Iterator[str]:
+    """Run Athena queries issued in this context under the given priority class."""
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {priority}")
+    token = _current_priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _current_priority.reset(token)
+
+
+class _Ticket:
+    __slots__ = ("priority", "rank", "seq", "enqueued_at")
+
+    def __init__(self, priority: str, seq: int):
+        self.priority = priority
+        self.rank = PRIORITY_CLASSES[priority]
+        self.seq = seq
+        self.enqueued_at = time.time()
+
+    def effective_rank(self, now: float) -> float:
+        if ADMISSION_AGING_S <= 0:
+            return self.rank
+        return self.rank - (now - self.enqueued_at) / ADMISSION_AGING_S
+
+
+class AdmissionScheduler:
+    """
+    Per-container admission control for Athena executions.
+    At most max_inflight queries run at once; waiters are admitted by priority class with
+    aging, FIFO within a class. Tracks queue depth and wait times per class.
+
+    Lambda runs one invocation per container, so this only orders fan-out inside an invocation
+    (batch sub-requests, summary scans, warm-up steps, parallel agent tools, prefetches). It
+    cannot make queries from other invocations yield; classes are separated across invocations
+    by running them in per-class workgroups (CLASS_WORKGROUPS).
+    """
+
+    def __init__(self, max_inflight: int = ATHENA_MAX_INFLIGHT, sample_size: int = 200):
+        self.max_inflight = max(1, max_inflight)
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._waiting: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=sample_size) for p in PRIORITY_CLASSES}
+        self._admitted: Dict[str, int] = {p: 0 for p in PRIORITY_CLASSES}
+
+    def _is_next(self, ticket: _Ticket) -> bool:
+        now = time.time()
+        best = min(self._waiting, key=lambda t: (t.effective_rank(now), t.seq))
+        return best is ticket
+
+    def acquire(self, priority: str, deadline: Optional[Deadline] = None) -> float:
+        """Block until a slot is free for this query; returns seconds spent waiting."""
+        ticket = _Ticket(priority, next(self._seq))
+        with self._cond:
+            self._waiting.append(ticket)
+            try:
+                while not (self._inflight < self.max_inflight and self._is_next(ticket)):
+                    timeout = 0.5
+                    if deadline is not None:
+                        if deadline.expired():
+                            raise DeadlineExceeded("Request deadline exceeded while queued for Athena")
+                        timeout = min(timeout, max(deadline.remaining(), 0.01))
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting.remove(ticket)
+                # Admission order may have changed for the remaining waiters
+                self._cond.notify_all()
+            self._inflight += 1
+            waited = time.time() - ticket.enqueued_at
+            self._waits[priority].append(waited)
+            self._admitted[priority] += 1
+            return waited
+
+    def release(self) -> None:
+        with self._cond:
+            self._inflight = max(0, self._inflight - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, deadline: Optional[Deadline] = None) -> Iterator[float]:
+        priority = priority or current_priority()
+        waited = self.acquire(priority, deadline)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of in-flight count, queue depth and wait times (ms) per priority class."""
+        with self._cond:
+            depth = {p: 0 for p in PRIORITY_CLASSES}
+            for t in self._waiting:
+                depth[t.priority] += 1
+            waits = {p: sorted(self._waits[p]) for p in PRIORITY_CLASSES}
+            admitted = dict(self._admitted)
+            inflight = self._inflight
+        wait_ms: Dict[str, Any] = {}
+        for p, samples in waits.items():
+            if not samples:
+                wait_ms[p] = {"admitted": admitted[p], "avg": 0, "p95": 0, "max": 0}
+                continue
+            p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+            wait_ms[p] = {
+                "admitted": admitted[p],
+                "avg": round(1000 * sum(samples) / len(samples), 1),
+                "p95": round(1000 * p95, 1),
+                "max": round(1000 * samples[-1], 1),
+            }
+        return {
+            "inflight": inflight,
+            "maxInflight": self.max_inflight,
+            "queueDepth": depth,
+            "waitMs": wait_ms,
+        }
+
+
+# Shared by every Athena caller in the container (in-invocation fan-out only, see above)
+SCHEDULER = AdmissionScheduler()
@@ -1,22 +1,81 @@
 import os
+import random
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import boto3
+from botocore.exceptions import ClientError
+
+from willa_rest_api.utils.admission import SCHEDULER, current_priority, workgroup_for
+from willa_rest_api.utils.cache import SingleFlight, TTLCache
+from willa_rest_api.utils.deadline import Deadline, DeadlineExceeded, current_deadline, stop_athena_query
+from willa_rest_api.utils.query import Query, as_query
+from willa_rest_api.utils.tracing import annotate, span
 
 # Defaults can be overridden via kwargs or environment variables
 DEFAULT_REGION = os.getenv("AWS_REGION", "us-east-1")
 DEFAULT_DATABASE = os.getenv("ATHENA_DATABASE", "willa_datalake")
 DEFAULT_WORKGROUP = os.getenv("ATHENA_WORKGROUP", "willa_datalake")
+# StartQueryExecution is retried with jittered exponential backoff when throttled
+THROTTLE_ERROR_CODES = ("TooManyRequestsException", "ThrottlingException")
+START_MAX_ATTEMPTS = int(os.getenv("ATHENA_START_MAX_ATTEMPTS", "5"))
+# Short-lived cache of query results shared by listing/count endpoints and warm-up
+ATHENA_RESULT_CACHE_TTL_S = float(os.getenv("ATHENA_RESULT_CACHE_TTL_S", "60"))
+RESULT_CACHE = TTLCache(ttl_s=ATHENA_RESULT_CACHE_TTL_S, max_entries=512)
+# Concurrent identical executions (same fingerprint and target) share one Athena query
+INFLIGHT_QUERIES = SingleFlight()
+
+_CLIENTS: Dict[str, Any] = {}
+_CLIENTS_LOCK = threading.Lock()
 
 
 def get_athena_client(region: Optional[str] = None) -> Any:
-    session = boto3.session.Session(region_name=region or DEFAULT_REGION)
-    return session.client("athena", region_name=region or DEFAULT_REGION)
+    """Return the container's Athena client for region, creating it on first use."""
+    region = region or DEFAULT_REGION
+    with _CLIENTS_LOCK:
+        if region not in _CLIENTS:
+            session = boto3.session.Session(region_name=region)
+            _CLIENTS[region] = session.client("athena", region_name=region)
+        return _CLIENTS[region]
+
+
+def start_query_execution_with_retry(
+    athena: Any,
+    start_kwargs: Dict[str, Any],
+    deadline: Optional[Deadline] = None,
+) -> str:
+    """Start an Athena execution, retrying throttling errors with backoff; returns the QueryExecutionId."""
+    attempt = 0
+    while True:
+        try:
+            return athena.start_query_execution(**start_kwargs)["QueryExecutionId"]
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            attempt += 1
+            if code not in THROTTLE_ERROR_CODES or attempt >= START_MAX_ATTEMPTS:
+                raise
+            backoff = min(8.0, 0.25 * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+            if deadline is not None and deadline.remaining() <= backoff:
+                raise DeadlineExceeded("Request deadline exceeded while Athena was throttling")
+            print(f"[athena:throttled] code={code} attempt={attempt} backoff={backoff:.2f}s")
+            time.sleep(backoff)
+
+
+def annotate_execution_stats(info: Dict[str, Any]) -> None:
+    """Copy Athena's own queue/execution split onto the current trace span."""
+    stats = info.get("QueryExecution", {}).get("Statistics") or {}
+    annotate(
+        queueMs=stats.get("QueryQueueTimeInMillis"),
+        execMs=stats.get("EngineExecutionTimeInMillis"),
+        totalMs=stats.get("TotalExecutionTimeInMillis"),
+        scannedBytes=stats.get("DataScannedInBytes"),
+    )
 
 
 def run_athena_query(
-    query: str,
+    query: Union[str, Query],
+    params: Optional[Sequence[Any]] = None,
     *,
     database: Optional[str] = None,
     workgroup: Optional[str] = None,
@@ -24,61 +83,173 @@ def run_athena_query(
     client: Optional[Any] = None,
     poll_interval_s: float = 0.5,
     max_wait_s: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    priority: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Execute an Athena query and return results as a list of dicts.
+    - query is a Query, or a template whose `?` placeholders are bound from params via
+      ExecutionParameters.
     - database/workgroup/region override env defaults if provided.
     - client can be passed to reuse an existing boto3 athena client.
     - poll_interval_s controls query status polling cadence.
     - max_wait_s optionally caps total wait time before raising TimeoutError.
+    - deadline defaults to the request-scoped deadline; once it passes, polling stops and
+      DeadlineExceeded is raised. Timed-out executions are stopped so they free workgroup slots.
+    - priority selects the admission class (interactive | agent | export); defaults to the
+      class set via admission.query_priority(), else interactive. Without an explicit
+      workgroup, the class's workgroup (ATHENA_WORKGROUP_<CLASS>) is used when configured.
+    Identical queries already running in this container at the same priority are joined instead of
+    started again; if the shared execution hits its leader's deadline or is cancelled, joiners with
+    time left rerun it.
+    Inside a sampled trace, records an "athena.query" span with local admission wait and
+    Athena's queue/execution times.
     """
-    athena = client or get_athena_client(region)
+    query = as_query(query, params)
+    priority = priority or current_priority()
+    workgroup = workgroup or workgroup_for(priority, DEFAULT_WORKGROUP)
+    deadline = deadline or current_deadline()
+    if deadline is not None:
+        deadline.check()
+    # Priority is part of the key so a request never waits behind another class's admission slot
+    key = (
+        query.fingerprint,
+        database or DEFAULT_DATABASE,
+        workgroup or DEFAULT_WORKGROUP,
+        region or DEFAULT_REGION,
+        priority,
+    )
 
-    start_kwargs: Dict[str, Any] = {
-        "QueryString": query,
-        "QueryExecutionContext": {"Database": database or DEFAULT_DATABASE},
-        "WorkGroup": workgroup or DEFAULT_WORKGROUP,
-    }
-    start_resp = athena.start_query_execution(**start_kwargs)
-    qid = start_resp["QueryExecutionId"]
+    def leader_gave_up(error: BaseException) -> bool:
+        # The leader's deadline passed or its execution was cancelled; rerun if we still have time
+        if deadline is not None and deadline.expired():
+            return False
+        return isinstance(error, DeadlineExceeded) or "CANCELLED" in str(error)
+
+    try:
+        rows, shared = INFLIGHT_QUERIES.do(
+            key,
+            lambda: _execute_athena_query(
+                query,
+                database=database,
+                workgroup=workgroup,
+                region=region,
+                client=client,
+                poll_interval_s=poll_interval_s,
+                max_wait_s=max_wait_s,
+                deadline=deadline,
+                priority=priority,
+            ),
+            timeout=deadline.remaining() if deadline is not None else max_wait_s,
+            retry=leader_gave_up,
+        )
+    except DeadlineExceeded:
+        raise
+    except TimeoutError:
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded("Request deadline exceeded while waiting for a shared Athena query")
+        raise
+    # Callers may annotate rows, so joiners get their own copies
+    return [dict(r) for r in rows] if shared else rows
 
-    start_time = time.time()
-    while True:
-        info = athena.get_query_execution(QueryExecutionId=qid)
-        state = info["QueryExecution"]["Status"]["State"]
-        if state in ("SUCCEEDED", "FAILED", "CANCELLED"):
-            break
-        if max_wait_s is not None and (time.time() - start_time) > max_wait_s:
-            raise TimeoutError(f"Athena query timed out after {max_wait_s} seconds")
-        time.sleep(poll_interval_s)
-    if state != "SUCCEEDED":
-        reason = info["QueryExecution"]["Status"].get("StateChangeReason", "")
-        raise RuntimeError(f"Athena query failed: {state} {reason}")
-
-    # Fetch paginated results (if any)
-    items: List[Dict[str, Any]] = []
-    next_token: Optional[str] = None
-    headers: Optional[List[str]] = None
-    while True:
-        results_kwargs: Dict[str, Any] = {"QueryExecutionId": qid}
-        if next_token:
-            results_kwargs["NextToken"] = next_token
-        results = athena.get_query_results(**results_kwargs)
-        rows = results.get("ResultSet", {}).get("Rows", [])
-        if not rows:
-            break
-        if headers is None:
-            headers = [col.get("VarCharValue", f"col_{i}") for i, col in enumerate(rows[0].get("Data", []))]
-            data_rows = rows[1:]
-        else:
-            data_rows = rows
-        for row in data_rows:
-            data_cells = row.get("Data", [])
-            item = {headers[i]: cell.get("VarCharValue") for i, cell in enumerate(data_cells)}
-            items.append(item)
-        next_token = results.get("NextToken")
-        if not next_token:
-            break
-    return items
+
+def _execute_athena_query(
+    query: Query,
+    *,
+    database: Optional[str],
+    workgroup: Optional[str],
+    region: Optional[str],
+    client: Optional[Any],
+    poll_interval_s: float,
+    max_wait_s: Optional[float],
+    deadline: Optional[Deadline],
+    priority: Optional[str],
+) -> List[Dict[str, Any]]:
+    with span("athena.query", sql=query.sql, template=query.template_fingerprint[:12], priority=priority):
+        athena = client or get_athena_client(region)
+        start_kwargs: Dict[str, Any] = {
+            "QueryString": query.sql,
+            "QueryExecutionContext": {"Database": database or DEFAULT_DATABASE},
+            "WorkGroup": workgroup or DEFAULT_WORKGROUP,
+        }
+        if query.params:
+            start_kwargs["ExecutionParameters"] = query.literals
+        # Hold an admission slot only while the execution occupies workgroup concurrency
+        with SCHEDULER.slot(priority, deadline) as waited:
+            annotate(admissionMs=round(waited * 1000, 1))
+            qid = start_query_execution_with_retry(athena, start_kwargs, deadline)
+            if deadline is not None:
+                deadline.register_query(athena, qid)
+
+            start_time = time.time()
+            try:
+                while True:
+                    info = athena.get_query_execution(QueryExecutionId=qid)
+                    state = info["QueryExecution"]["Status"]["State"]
+                    if state in ("SUCCEEDED", "FAILED", "CANCELLED"):
+                        break
+                    if max_wait_s is not None and (time.time() - start_time) > max_wait_s:
+                        stop_athena_query(athena, qid)
+                        raise TimeoutError(f"Athena query timed out after {max_wait_s} seconds")
+                    sleep_s = poll_interval_s
+                    if deadline is not None:
+                        if deadline.expired():
+                            stop_athena_query(athena, qid)
+                            raise DeadlineExceeded(f"Athena query {qid} cancelled at request deadline")
+                        sleep_s = min(sleep_s, deadline.remaining())
+                    time.sleep(sleep_s)
+            finally:
+                if deadline is not None:
+                    deadline.unregister_query(athena, qid)
+        if state == "CANCELLED" and deadline is not None and deadline.expired():
+            raise DeadlineExceeded(f"Athena query {qid} cancelled at request deadline")
+        if state != "SUCCEEDED":
+            reason = info["QueryExecution"]["Status"].get("StateChangeReason", "")
+            raise RuntimeError(f"Athena query failed: {state} {reason}")
+        annotate_execution_stats(info)
+
+        # Fetch paginated results (if any)
+        items: List[Dict[str, Any]] = []
+        next_token: Optional[str] = None
+        headers: Optional[List[str]] = None
+        while True:
+            results_kwargs: Dict[str, Any] = {"QueryExecutionId": qid}
+            if next_token:
+                results_kwargs["NextToken"] = next_token
+            results = athena.get_query_results(**results_kwargs)
+            rows = results.get("ResultSet", {}).get("Rows", [])
+            if not rows:
+                break
+            if headers is None:
+                headers = [col.get("VarCharValue", f"col_{i}") for i, col in enumerate(rows[0].get("Data", []))]
+                data_rows = rows[1:]
+            else:
+                data_rows = rows
+            for row in data_rows:
+                data_cells = row.get("Data", [])
+                item = {headers[i]: cell.get("VarCharValue") for i, cell in enumerate(data_cells)}
+                items.append(item)
+            next_token = results.get("NextToken")
+            if not next_token:
+                break
+        annotate(rows=len(items))
+        return items
 
 
+def result_cache_key(query: Union[str, Query], params: Optional[Sequence[Any]] = None) -> str:
+    """RESULT_CACHE key for a query: its fingerprint over template and bound values."""
+    return as_query(query, params).fingerprint
+
+
+def run_cached_athena_query(
+    query: Union[str, Query],
+    params: Optional[Sequence[Any]] = None,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """
+    run_athena_query backed by RESULT_CACHE, keyed on the query fingerprint.
+    Rows are copied on the way out so callers may annotate them freely.
+    """
+    query = as_query(query, params)
+    rows = RESULT_CACHE.get_or_compute(query.fingerprint, lambda: run_athena_query(query, **kwargs))
+    return [dict(r) for r in rows]
@@ -0,0 +1,262 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from willa_rest_api.utils.admission import PRIORITY_CLASSES, current_priority
+from willa_rest_api.utils.deadline import current_deadline
+
+
+class _KeyLock:
+    __slots__ = ("lock", "waiters", "priority")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Callers holding or waiting on lock; the entry is dropped when this reaches zero
+        self.waiters = 0
+        # Priority class of the caller currently computing, if any
+        self.priority: Optional[str] = None
+
+
+class TTLCache:
+    """
+    Small thread-safe in-memory cache with a per-entry time-to-live.
+    Lives for the lifetime of the Lambda container, so warm invocations reuse entries.
+    """
+
+    def __init__(self, ttl_s: float, max_entries: int = 256):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, _KeyLock] = {}
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, value); expired entries count as a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_s:
+                self._entries.pop(key, None)
+                return False, None
+            return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Evict the oldest entry
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                self._entries.pop(oldest, None)
+            self._entries[key] = (time.time(), value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing it on a miss.
+        Concurrent misses for the same key wait for a single computation, but only within the
+        caller's deadline and never behind a lower-priority computation (e.g. an export prefetch);
+        otherwise the caller computes the value itself.
+        """
+        hit, value = self.get(key)
+        if hit:
+            return value
+        priority = current_priority()
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock()
+            key_lock.waiters += 1
+            holder = key_lock.priority
+        try:
+            if holder is not None and PRIORITY_CLASSES[priority] < PRIORITY_CLASSES[holder]:
+                acquired = False
+            else:
+                deadline = current_deadline()
+                acquired = key_lock.lock.acquire(timeout=deadline.remaining() if deadline is not None else -1)
+            if not acquired:
+                value = compute()
+                self.set(key, value)
+                return value
+            try:
+                with self._lock:
+                    key_lock.priority = priority
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                value = compute()
+                self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    key_lock.priority = None
+                key_lock.lock.release()
+        finally:
+            # Dropped only once nobody holds or waits on it, so a failed compute is retried
+            # by the next waiter instead of racing a fresh lock
+            with self._lock:
+                key_lock.waiters -= 1
+                if key_lock.waiters == 0 and self._key_locks.get(key) is key_lock:
+                    self._key_locks.pop(key, None)
+
+
+class StaleWhileRevalidateCache:
+    """
+    Cache that serves the last computed value immediately and refreshes it in the background.
+    - Younger than soft_ttl_s: served as-is.
+    - Between soft_ttl_s and hard_ttl_s: served as-is while a worker thread recomputes it.
+    - Older than hard_ttl_s (or missing): recomputed synchronously.
+    Concurrent refreshes of the same key are deduplicated. Note that Lambda freezes background
+    threads between invocations, so a refresh may complete during the next warm invocation.
+    """
+
+    def __init__(self, soft_ttl_s: float, hard_ttl_s: float):
+        self.soft_ttl_s = soft_ttl_s
+        self.hard_ttl_s = max(hard_ttl_s, soft_ttl_s)
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._refreshing: set = set()
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _compute_and_store(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, float]:
+        value = compute()
+        computed_at = time.time()
+        with self._lock:
+            self._entries[key] = (computed_at, value)
+        return value, computed_at
+
+    def _refresh_in_background(self, key: Hashable, compute: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def worker():
+            try:
+                with self._key_lock(key):
+                    self._compute_and_store(key, compute)
+            except Exception as e:
+                # Keep serving the previous value; the next stale read retries
+                print(f"[cache:refresh:error] key={key} err={e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=worker, name=f"swr-refresh-{key}", daemon=True).start()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, float]:
+        """Return (value, computed_at epoch seconds) for key."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            computed_at, value = entry
+            age = time.time() - computed_at
+            if age <= self.soft_ttl_s:
+                return value, computed_at
+            if age <= self.hard_ttl_s:
+                self._refresh_in_background(key, compute)
+                return value, computed_at
+        with self._key_lock(key):
+            # Another caller may have refreshed while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] <= self.hard_ttl_s:
+                return entry[1], entry[0]
+            return self._compute_and_store(key, compute)
+
+    def put(self, key: Hashable, value: Any) -> float:
+        """Store a value computed elsewhere (e.g. as a by-product of a wider query); returns computed_at."""
+        computed_at = time.time()
+        with self._lock:
+            self._entries[key] = (computed_at, value)
+        return computed_at
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution: the first caller runs fn,
+    later callers arriving while it runs wait for and share its result (or exception).
+    Nothing is retained once the call finishes; pair with TTLCache for reuse over time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats = {"executions": 0, "shared": 0, "retried": 0}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        timeout: Optional[float] = None,
+        retry: Optional[Callable[[BaseException], bool]] = None,
+    ) -> Tuple[Any, bool]:
+        """
+        Return (value, shared). shared is True when another caller's execution was reused.
+        Raises TimeoutError if a shared execution does not finish within timeout seconds.
+        A joiner whose shared execution failed with an error for which retry(error) is true
+        (e.g. the leader's own deadline passed) tries again, becoming the leader if none is running.
+        """
+        ends_at = time.time() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self._stats["executions"] += 1
+                else:
+                    self._stats["shared"] += 1
+            if leader:
+                break
+            wait_s = max(0.0, ends_at - time.time()) if ends_at is not None else None
+            if not flight.done.wait(wait_s):
+                raise TimeoutError("Timed out waiting for a shared execution")
+            if flight.error is None:
+                return flight.value, True
+            if retry is None or not retry(flight.error):
+                raise flight.error
+            with self._lock:
+                self._stats["retried"] += 1
+        try:
+            flight.value = fn()
+            return flight.value, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["inflight"] = len(self._flights)
+        return stats
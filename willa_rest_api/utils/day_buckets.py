@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+DEFAULT_BUCKET_DIR = os.getenv("DAY_BUCKET_DIR", "/tmp/willa_day_buckets")
+
+
+def _empty_state() -> Dict[str, Any]:
+    # counts: {day: count}; openFetchedAt: {day: epoch s} for days last fetched while still open
+    return {"counts": {}, "openFetchedAt": {}}
+
+
+class MemoryDayBucketBackend:
+    """Keeps buckets only for the lifetime of the container."""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+
+    def load(self, entity: str) -> Dict[str, Any]:
+        state = self._data.get(entity) or _empty_state()
+        return {"counts": dict(state["counts"]), "openFetchedAt": dict(state["openFetchedAt"])}
+
+    def save(self, entity: str, state: Dict[str, Any]) -> None:
+        self._data[entity] = {"counts": dict(state["counts"]), "openFetchedAt": dict(state["openFetchedAt"])}
+
+
+class FileDayBucketBackend:
+    """
+    Persists one JSON file per entity ({"counts": {day: count}, "openFetchedAt": {day: ts}}),
+    e.g. under /tmp so it survives warm restarts.
+    """
+
+    def __init__(self, directory: str = DEFAULT_BUCKET_DIR):
+        self.directory = directory
+
+    def _path(self, entity: str) -> str:
+        return os.path.join(self.directory, f"{entity}.json")
+
+    def load(self, entity: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(entity), "r", encoding="utf-8") as fh:
+                data = json.load(fh) or {}
+        except FileNotFoundError:
+            return _empty_state()
+        except Exception as e:
+            print(f"[day_buckets:load:error] entity={entity} err={e}")
+            return _empty_state()
+        if not isinstance(data, dict) or not isinstance(data.get("counts"), dict):
+            # Unrecognized file: start over rather than trust counts with unknown fetch times
+            return _empty_state()
+        return {
+            "counts": {str(k): int(v) for k, v in (data.get("counts") or {}).items()},
+            "openFetchedAt": {str(k): float(v) for k, v in (data.get("openFetchedAt") or {}).items()},
+        }
+
+    def save(self, entity: str, state: Dict[str, Any]) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(entity) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(state, fh)
+            os.replace(tmp_path, self._path(entity))
+        except Exception as e:
+            print(f"[day_buckets:save:error] entity={entity} err={e}")
+
+
+def get_default_backend():
+    """Select the persistence backend from DAY_BUCKET_BACKEND (file | memory)."""
+    if os.getenv("DAY_BUCKET_BACKEND", "file").lower() == "memory":
+        return MemoryDayBucketBackend()
+    return FileDayBucketBackend()
+
+
+def _missing_runs(days: List[date], known: Dict[str, int]) -> List[Tuple[date, date]]:
+    """Group days absent from `known` into contiguous [start, end] runs."""
+    runs: List[Tuple[date, date]] = []
+    for d in days:
+        if d.isoformat() in known:
+            continue
+        if runs and runs[-1][1] + timedelta(days=1) == d:
+            runs[-1] = (runs[-1][0], d)
+        else:
+            runs.append((d, d))
+    return runs
+
+
+class DayBucketStore:
+    """
+    Incremental per-entity store of daily counts.
+    Closed days (older than today minus `late_arrival_days`) never change and are fetched once
+    after they close. Open days are refetched at most every `open_ttl_s` seconds, and a day whose
+    last fetch happened while it was still open is refetched once more after it closes, so a
+    partial count never becomes permanent. Only those days are queried, and results are merged
+    into the cached history held in memory and in the backend.
+    """
+
+    def __init__(self, backend=None, late_arrival_days: int = 1, open_ttl_s: float = 300, max_days: int = 1825):
+        self.backend = backend or get_default_backend()
+        self.late_arrival_days = max(0, late_arrival_days)
+        self.open_ttl_s = open_ttl_s
+        self.max_days = max_days
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._entity_locks: Dict[str, threading.Lock] = {}
+
+    def _entity_lock(self, entity: str) -> threading.Lock:
+        with self._lock:
+            return self._entity_locks.setdefault(entity, threading.Lock())
+
+    def _entity_state(self, entity: str) -> Dict[str, Any]:
+        if entity not in self._state:
+            self._state[entity] = self.backend.load(entity)
+        return self._state[entity]
+
+    def _closed_at(self, day: str) -> float:
+        """Epoch seconds at which `day` leaves the late-arrival window."""
+        closes = date.fromisoformat(day) + timedelta(days=self.late_arrival_days + 1)
+        return datetime(closes.year, closes.month, closes.day, tzinfo=timezone.utc).timestamp()
+
+    def _is_final(self, day: str, open_fetched_at: Dict[str, float], open_from: str, now: float) -> bool:
+        fetched_at = open_fetched_at.get(day)
+        if day >= open_from:
+            return fetched_at is not None and now - fetched_at <= self.open_ttl_s
+        return fetched_at is None or fetched_at >= self._closed_at(day)
+
+    def get_counts(
+        self,
+        entity: str,
+        start: date,
+        end: date,
+        today: date,
+        fetch: Callable[[date, date], Dict[str, int]],
+    ) -> np.ndarray:
+        """
+        Return zero-filled daily counts for [start, end], calling fetch(run_start, run_end)
+        only for runs of days that are missing or still open.
+        fetch must return {YYYY-MM-DD: count} for days with activity in the run.
+        """
+        end = min(end, today)
+        if end < start:
+            return np.zeros(0, dtype=np.int64)
+        open_from = today - timedelta(days=self.late_arrival_days)
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        with self._entity_lock(entity):
+            state = self._entity_state(entity)
+            buckets: Dict[str, int] = state["counts"]
+            open_fetched_at: Dict[str, float] = state["openFetchedAt"]
+            now = time.time()
+            known = {
+                k: v for k, v in buckets.items()
+                if self._is_final(k, open_fetched_at, open_from.isoformat(), now)
+            }
+            runs = _missing_runs(days, known)
+            if runs:
+                for run_start, run_end in runs:
+                    print(f"[day_buckets] entity={entity} fetch {run_start}..{run_end}")
+                    # Stamp before querying: rows landing during the query count as after the fetch
+                    fetched_at = time.time()
+                    result = fetch(run_start, run_end)
+                    for i in range((run_end - run_start).days + 1):
+                        day = run_start + timedelta(days=i)
+                        key = day.isoformat()
+                        buckets[key] = int(result.get(key, 0))
+                        if fetched_at < self._closed_at(key):
+                            open_fetched_at[key] = fetched_at
+                        else:
+                            open_fetched_at.pop(key, None)
+                # Keep the history bounded
+                if len(buckets) > self.max_days:
+                    for key in sorted(buckets)[: len(buckets) - self.max_days]:
+                        buckets.pop(key, None)
+                        open_fetched_at.pop(key, None)
+                self.backend.save(entity, state)
+            return np.array([buckets.get(d.isoformat(), 0) for d in days], dtype=np.int64)
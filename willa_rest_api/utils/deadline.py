@@ -0,0 +1,136 @@
+import contextvars
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Set, Tuple
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when request-scoped work runs past its deadline or is cancelled."""
+
+
+class Deadline:
+    """
+    Request-scoped deadline shared by services, agent tools and the Athena layer.
+    Athena executions started under a deadline are registered so cancel() can stop them;
+    cancelling a deadline also cancels its children (e.g. per-tool deadlines).
+    """
+
+    def __init__(self, expires_at: float, parent: Optional["Deadline"] = None):
+        self.expires_at = expires_at if parent is None else min(expires_at, parent.expires_at)
+        self.parent = parent
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._queries: Set[Tuple[Any, str]] = set()
+        # Weak so finished sub-tasks' deadlines do not accumulate on a long-lived parent
+        self._children: "weakref.WeakSet[Deadline]" = weakref.WeakSet()
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.time() + max(0.0, seconds))
+
+    def child(self, seconds: float) -> "Deadline":
+        """A tighter deadline for a sub-task; cancelling this one cancels it and stops its queries."""
+        child = Deadline(time.time() + max(0.0, seconds), parent=self)
+        with self._lock:
+            self._children.add(child)
+        if self._cancelled.is_set():
+            child.cancel()
+        return child
+
+    @classmethod
+    def from_lambda_context(
+        cls,
+        context: Any,
+        *,
+        reserve_ms: int = 1000,
+        cap_s: Optional[float] = None,
+    ) -> Optional["Deadline"]:
+        """
+        Derive a deadline from context.get_remaining_time_in_millis(), keeping reserve_ms
+        to respond before Lambda kills the invocation. cap_s optionally shortens it further.
+        Returns None without a usable context (and no cap), e.g. in local runs.
+        """
+        remaining_s: Optional[float] = None
+        get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+        if callable(get_remaining):
+            try:
+                remaining_s = (int(get_remaining()) - reserve_ms) / 1000.0
+            except Exception:
+                remaining_s = None
+        if cap_s is not None:
+            remaining_s = cap_s if remaining_s is None else min(remaining_s, cap_s)
+        if remaining_s is None:
+            return None
+        return cls.after(remaining_s)
+
+    def remaining(self) -> float:
+        """Seconds left; 0 once expired or cancelled."""
+        if self.expired():
+            return 0.0
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self) -> bool:
+        if self.parent is not None and self.parent.expired():
+            return True
+        return self._cancelled.is_set() or time.time() >= self.expires_at
+
+    def check(self) -> None:
+        if self.expired():
+            raise DeadlineExceeded("Request deadline exceeded")
+
+    def register_query(self, client: Any, query_id: str) -> None:
+        with self._lock:
+            self._queries.add((client, query_id))
+        # Started after a cancel (or an ancestor's): stop it now rather than rely on the poller
+        if self.expired():
+            self.cancel()
+
+    def unregister_query(self, client: Any, query_id: str) -> None:
+        with self._lock:
+            self._queries.discard((client, query_id))
+
+    def cancel(self) -> None:
+        """
+        Mark the deadline as cancelled and stop any Athena executions still registered here or
+        on child deadlines. Abandoned worker threads may never poll again, so this does not
+        rely on them noticing.
+        """
+        self._cancelled.set()
+        with self._lock:
+            queries = list(self._queries)
+            self._queries.clear()
+            children = list(self._children)
+        for client, query_id in queries:
+            stop_athena_query(client, query_id)
+        for child in children:
+            child.cancel()
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "willa_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make `deadline` the current deadline for this context (and contexts copied from it)."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def stop_athena_query(client: Any, query_id: str) -> None:
+    """Best-effort StopQueryExecution so abandoned queries release workgroup concurrency."""
+    try:
+        client.stop_query_execution(QueryExecutionId=query_id)
+        print(f"[athena] cancelled qid={query_id}")
+    except Exception as e:
+        print(f"[athena:cancel:error] qid={query_id} err={e}")
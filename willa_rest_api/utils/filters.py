@@ -0,0 +1,120 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# Filters understood by each listing. `q` is a case-insensitive substring match
+# against the listed text columns.
+SAVE_FILTER_FIELDS = ("username", "publisher", "isarchived", "createdFrom", "createdTo", "q")
+BOARD_FILTER_FIELDS = ("username", "isarchived", "createdFrom", "createdTo", "q")
+SAVE_TEXT_COLUMNS = ("title", "url")
+BOARD_TEXT_COLUMNS = ("name",)
+
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?$")
+
+
+def _parse_bool(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    s = str(value or "").strip().lower()
+    if s in ("true", "1", "yes"):
+        return True
+    if s in ("false", "0", "no"):
+        return False
+    return None
+
+
+def _parse_timestamp(value: Any, *, end_of_day: bool = False) -> Optional[str]:
+    """
+    Normalize a date or timestamp to the form stored in createdat so string comparison is time
+    order: bare dates stay YYYY-MM-DD, timestamps become UTC YYYY-MM-DDTHH:MM:SS.mmmZ.
+    Offsets are converted to UTC; timestamps without one are taken as UTC.
+    """
+    s = str(value or "").strip()
+    if not s or not _TIMESTAMP_RE.match(s):
+        return None
+    if len(s) == 10:
+        try:
+            day = date.fromisoformat(s)
+        except ValueError:
+            return None
+        # A bare date as upper bound includes that whole day
+        return (day + timedelta(days=1)).isoformat() if end_of_day else day.isoformat()
+    try:
+        parsed = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S.") + f"{parsed.microsecond // 1000:03d}Z"
+
+
+def parse_filter_params(params: Optional[Dict[str, Any]], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Extract supported filters from API Gateway query string parameters.
+    Unknown keys and malformed values are ignored, mirroring how limit/offset are handled.
+    """
+    params = params or {}
+    filters: Dict[str, Any] = {}
+    for field in fields:
+        raw = params.get(field)
+        if raw is None or str(raw).strip() == "":
+            continue
+        if field == "isarchived":
+            value = _parse_bool(raw)
+        elif field == "createdFrom":
+            value = _parse_timestamp(raw)
+        elif field == "createdTo":
+            value = _parse_timestamp(raw, end_of_day=True)
+        else:
+            value = str(raw).strip()
+        if value is not None:
+            filters[field] = value
+    return filters
+
+
+def compile_filters(
+    filters: Optional[Dict[str, Any]],
+    *,
+    text_columns: Tuple[str, ...] = (),
+    cursor: Optional[Tuple[str, str]] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Compile a filters dict into a WHERE clause with `?` placeholders and its bound values.
+    cursor is the (createdat, id) of the last row already returned; only rows after it in
+    newest-first order match (keyset pagination). Returns ("", []) when there is nothing to filter on.
+
+    createdat is compared as a raw ISO-8601 string (lexicographic order matches time order,
+    since parse_filter_params normalizes bounds to UTC) so the predicate stays on the bare
+    column and can be pushed down to the scan.
+    """
+    filters = filters or {}
+    clauses: List[str] = []
+    values: List[Any] = []
+    if "username" in filters:
+        clauses.append("username = ?")
+        values.append(filters["username"])
+    if "publisher" in filters:
+        clauses.append("publisher = ?")
+        values.append(filters["publisher"])
+    if "isarchived" in filters:
+        clauses.append("isarchived = ?")
+        values.append(bool(filters["isarchived"]))
+    if "createdFrom" in filters:
+        clauses.append("createdat >= ?")
+        values.append(filters["createdFrom"])
+    if "createdTo" in filters:
+        clauses.append("createdat < ?")
+        values.append(filters["createdTo"])
+    if filters.get("q") and text_columns:
+        needle = str(filters["q"]).lower()
+        parts = [f"strpos(lower({col}), ?) > 0" for col in text_columns]
+        clauses.append("(" + " OR ".join(parts) + ")")
+        values.extend([needle] * len(text_columns))
+    if cursor and cursor[0] and cursor[1]:
+        last_created_at, last_id = cursor
+        clauses.append("(createdat < ? OR (createdat = ? AND id < ?))")
+        values.extend([last_created_at, last_created_at, last_id])
+    if not clauses:
+        return "", []
+    return "WHERE " + " AND ".join(clauses), values
@@ -0,0 +1,258 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from willa_rest_api.utils.admission import query_priority
+from willa_rest_api.utils.athena import run_athena_query
+from willa_rest_api.utils.filters import compile_filters
+from willa_rest_api.utils.query import select
+
+HOT_TIER_ENABLED = os.getenv("HOT_TIER_ENABLED", "false").lower() in ("1", "true", "yes")
+HOT_TIER_PATH = os.getenv("HOT_TIER_PATH", "/tmp/willa_hot_tier.sqlite3")
+HOT_TIER_DAYS = int(os.getenv("HOT_TIER_DAYS", "7"))
+HOT_TIER_SYNC_TTL_S = float(os.getenv("HOT_TIER_SYNC_TTL_S", "300"))
+# Reads fall back to Athena once the last completed sync started longer ago than this
+# (e.g. while syncs keep failing)
+HOT_TIER_MAX_STALENESS_S = float(os.getenv("HOT_TIER_MAX_STALENESS_S", str(2 * HOT_TIER_SYNC_TTL_S)))
+
+# entity -> (Athena table, selected columns)
+HOT_TIER_ENTITIES = {
+    "saves": ("latest_entity_save", None),
+    "boards": ("latest_entity_board", "*"),
+    "edges": ("latest_entity_edge", "*"),
+}
+# Columns lifted out of the row JSON so filters and ordering can use indexes
+_INDEXED_COLUMNS = ("createdat", "updatedat", "username", "publisher", "isarchived", "title", "url", "name", "boardid", "saveid")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _normalize_bool(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return "true" if str(value).strip().lower() in ("true", "1") else "false"
+
+
+class HotTier:
+    """
+    Embedded SQLite replica of recent saves, boards and edges (createdat within the last
+    window_days), synced from Athena. Rows keep their Athena shape as JSON, with the filterable
+    columns copied out and indexed. Callers fall back to Athena whenever the tier cannot answer.
+
+    Every sync re-reads the whole window and replaces the replica, so late-arriving, updated and
+    deleted rows are all picked up. The replica shows Athena as of the start of the last completed
+    sync: normally at most sync_ttl_s plus one sync's duration behind, and never served once that
+    is older than max_staleness_s.
+    """
+
+    def __init__(
+        self,
+        path: str = HOT_TIER_PATH,
+        window_days: int = HOT_TIER_DAYS,
+        sync_ttl_s: float = HOT_TIER_SYNC_TTL_S,
+        max_staleness_s: float = HOT_TIER_MAX_STALENESS_S,
+    ):
+        self.path = path
+        self.window_days = window_days
+        self.sync_ttl_s = sync_ttl_s
+        self.max_staleness_s = max(max_staleness_s, sync_ttl_s)
+        self._sync_lock = threading.Lock()
+        self._syncing = False
+        with closing(self._connect()) as conn, conn:
+            for entity in HOT_TIER_ENTITIES:
+                cols = ", ".join(f"{c} TEXT" for c in _INDEXED_COLUMNS)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {entity} (id TEXT PRIMARY KEY, {cols}, row TEXT NOT NULL)")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {entity}_createdat ON {entity} (createdat DESC, id DESC)")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {entity}_username ON {entity} (username, createdat DESC)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Sync state is read once here and then kept on the instance by sync()
+            self._window_start = self._meta(conn, "window_start")
+            synced_at = self._meta(conn, "synced_at")
+        self._synced_at = datetime.fromisoformat(synced_at) if synced_at else None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        # compile_filters emits Athena's strpos(); provide it so the same WHERE clause runs here
+        conn.create_function(
+            "strpos", 2, lambda haystack, needle: (haystack or "").find(needle or "") + 1, deterministic=True
+        )
+        return conn
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: str) -> None:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # --- Sync ---
+
+    def _age_s(self) -> Optional[float]:
+        synced_at = self._synced_at
+        return (_utcnow() - synced_at).total_seconds() if synced_at else None
+
+    def window_start(self) -> Optional[str]:
+        """Lower createdat bound the replica is complete for, or None before the first sync or once stale."""
+        age = self._age_s()
+        if age is None or age > self.max_staleness_s:
+            return None
+        return self._window_start
+
+    def is_ready(self) -> bool:
+        return self.window_start() is not None
+
+    def _fetch_entity(self, entity: str, cutoff: str) -> List[List[Any]]:
+        table, columns = HOT_TIER_ENTITIES[entity]
+        if columns is None:
+            from willa_rest_api.services.saves import SAVE_COLUMNS
+
+            columns = ", ".join(SAVE_COLUMNS)
+        records = []
+        for r in run_athena_query(select(table, columns, where=("createdat >= ?", [cutoff]))):
+            if not r.get("id"):
+                continue
+            values = [r.get(c) for c in _INDEXED_COLUMNS]
+            values[_INDEXED_COLUMNS.index("isarchived")] = _normalize_bool(r.get("isarchived"))
+            records.append([r["id"], *values, json.dumps(r)])
+        return records
+
+    def sync(self) -> Dict[str, int]:
+        """Re-read the whole window from Athena and replace the replica with it."""
+        # Taken before querying: the replica reflects Athena no later than this
+        now = _utcnow()
+        cutoff = (now - timedelta(days=self.window_days)).strftime("%Y-%m-%dT%H:%M:%S")
+        with query_priority("export"):
+            fetched = {entity: self._fetch_entity(entity, cutoff) for entity in HOT_TIER_ENTITIES}
+        # Apply everything in one transaction so readers never see a half-synced window;
+        # replacing each table also drops rows that no longer exist in Athena
+        placeholders = ", ".join(["?"] * (len(_INDEXED_COLUMNS) + 2))
+        with closing(self._connect()) as conn, conn:
+            for entity, records in fetched.items():
+                conn.execute(f"DELETE FROM {entity}")
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {entity} (id, {', '.join(_INDEXED_COLUMNS)}, row) VALUES ({placeholders})",
+                    records,
+                )
+            self._set_meta(conn, "window_start", cutoff)
+            self._set_meta(conn, "synced_at", now.isoformat())
+        self._window_start = cutoff
+        self._synced_at = now
+        counts = {entity: len(records) for entity, records in fetched.items()}
+        print(f"[hot_tier] synced window_start={cutoff} rows={counts}")
+        return counts
+
+    def sync_if_stale(self, background: bool = True) -> None:
+        """Start a sync when the replica is missing or older than sync_ttl_s; at most one runs at a time."""
+        age = self._age_s()
+        if age is not None and age < self.sync_ttl_s:
+            return
+        with self._sync_lock:
+            if self._syncing:
+                return
+            self._syncing = True
+
+        def run():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[hot_tier:sync:error] {e}")
+            finally:
+                with self._sync_lock:
+                    self._syncing = False
+
+        if background:
+            threading.Thread(target=run, name="hot-tier-sync", daemon=True).start()
+        else:
+            run()
+
+    # --- Reads ---
+
+    def _sqlite_params(self, params: List[Any]) -> List[Any]:
+        return [_normalize_bool(p) if isinstance(p, bool) else p for p in params]
+
+    def get_by_id(self, entity: str, item_id: str) -> Optional[Dict[str, Any]]:
+        if not self.is_ready():
+            return None
+        with closing(self._connect()) as conn:
+            row = conn.execute(f"SELECT row FROM {entity} WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_page(
+        self,
+        entity: str,
+        limit: int,
+        offset: int,
+        filters: Optional[Dict[str, Any]] = None,
+        text_columns: tuple = (),
+        cursor: Optional[Tuple[str, str]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the page (after offset rows, or after the (createdat, id) cursor) if it lies
+        entirely inside the replicated window, else None.
+        Everything outside the window is older, so if the replica holds at least offset + limit
+        matching rows, the newest-first page is the one Athena returned as of the last sync;
+        rows written since then (see the class docstring for the bound) are not on it yet.
+        """
+        if not self.is_ready():
+            return None
+        where_clause, params = compile_filters(filters, text_columns=text_columns, cursor=cursor)
+        params = self._sqlite_params(params)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT row FROM {entity} {where_clause} ORDER BY createdat DESC, id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        if len(rows) < limit:
+            return None
+        return [json.loads(r[0]) for r in rows]
+
+    def count(self, entity: str, filters: Optional[Dict[str, Any]] = None, text_columns: tuple = ()) -> Optional[int]:
+        """Count as of the last sync when the filters restrict createdat to inside the window, else None."""
+        start = self.window_start()
+        created_from = (filters or {}).get("createdFrom")
+        if start is None or not created_from or created_from < start:
+            return None
+        where_clause, params = compile_filters(filters, text_columns=text_columns)
+        with closing(self._connect()) as conn:
+            row = conn.execute(f"SELECT COUNT(1) FROM {entity} {where_clause}", self._sqlite_params(params)).fetchone()
+        return int(row[0]) if row else 0
+
+
+_HOT_TIER: Optional[HotTier] = None
+_HOT_TIER_LOCK = threading.Lock()
+
+
+def _get_instance() -> HotTier:
+    global _HOT_TIER
+    with _HOT_TIER_LOCK:
+        if _HOT_TIER is None:
+            _HOT_TIER = HotTier()
+        return _HOT_TIER
+
+
+def get_hot_tier() -> Optional[HotTier]:
+    """
+    Return the container's hot tier when HOT_TIER_ENABLED, kicking off a background sync if it
+    is stale. Returns None when disabled or unavailable so callers go straight to Athena.
+    """
+    if not HOT_TIER_ENABLED:
+        return None
+    try:
+        tier = _get_instance()
+        tier.sync_if_stale()
+        return tier
+    except Exception as e:
+        print(f"[hot_tier:error] {e}")
+        return None
+
+
+def prime_hot_tier() -> None:
+    """Sync the hot tier in the foreground if it is enabled and stale (used by warm-up)."""
+    if HOT_TIER_ENABLED:
+        _get_instance().sync_if_stale(background=False)
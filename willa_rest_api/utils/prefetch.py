@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from willa_rest_api.utils.admission import query_priority
+from willa_rest_api.utils.athena import ATHENA_RESULT_CACHE_TTL_S
+from willa_rest_api.utils.deadline import Deadline, deadline_scope
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_MAX_INFLIGHT = int(os.getenv("PREFETCH_MAX_INFLIGHT", "2"))
+PREFETCH_TIMEOUT_S = float(os.getenv("PREFETCH_TIMEOUT_S", "25"))
+
+
+class _Prefetch:
+    __slots__ = ("key", "state", "deadline", "completed_at")
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        # queued -> running -> done | failed; cancelled at any point before done
+        self.state = "queued"
+        self.deadline: Optional[Deadline] = None
+        self.completed_at: Optional[float] = None
+
+
+class Prefetcher:
+    """
+    Speculatively runs the query for the page a user is likely to request next and leaves the
+    result in the Athena result cache. Each listing ("slot") has at most one outstanding prefetch;
+    it is cancelled (stopping its Athena execution) when the next request for that slot asks for
+    something else. Lambda freezes the worker thread between invocations, so the prefetch's
+    deadline only starts once the worker actually runs.
+    """
+
+    def __init__(self, max_inflight: int = PREFETCH_MAX_INFLIGHT, timeout_s: float = PREFETCH_TIMEOUT_S):
+        self.max_inflight = max_inflight
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._inflight = 0
+        # slot -> outstanding prefetch
+        self._pending: Dict[str, _Prefetch] = {}
+        self._stats = {
+            "issued": 0, "completed": 0, "failed": 0, "skipped": 0,
+            "hits": 0, "joined": 0, "missed": 0, "cancelled": 0,
+        }
+
+    def _cancel(self, prefetch: _Prefetch) -> None:
+        with self._lock:
+            if prefetch.state in ("done", "failed"):
+                return
+            prefetch.state = "cancelled"
+            deadline = prefetch.deadline
+        if deadline is not None:
+            deadline.cancel()
+
+    def note_request(self, slot: str, key: Hashable) -> bool:
+        """
+        Record a real request for `key`. Returns True only when a completed prefetch left its
+        result in the cache for it. A prefetch still running is joined by the request (counted as
+        "joined"); one that failed, was cancelled or has aged out of the cache counts as "missed".
+        A prefetch for a different key is cancelled.
+        """
+        with self._lock:
+            prefetch = self._pending.pop(slot, None)
+            if prefetch is None:
+                return False
+            if prefetch.key == key:
+                fresh = (
+                    prefetch.state == "done"
+                    and prefetch.completed_at is not None
+                    and time.time() - prefetch.completed_at <= ATHENA_RESULT_CACHE_TTL_S
+                )
+                if fresh:
+                    self._stats["hits"] += 1
+                elif prefetch.state == "running":
+                    self._stats["joined"] += 1
+                else:
+                    self._stats["missed"] += 1
+                return fresh
+            self._stats["cancelled"] += 1
+        self._cancel(prefetch)
+        return False
+
+    def discard(self, slot: str) -> None:
+        """Cancel the slot's outstanding prefetch because the request was served without it."""
+        with self._lock:
+            prefetch = self._pending.pop(slot, None)
+            if prefetch is None:
+                return
+            self._stats["cancelled"] += 1
+        self._cancel(prefetch)
+
+    def schedule(self, slot: str, key: Hashable, fetch: Callable[[], Any]) -> bool:
+        """Start fetch() in the background for `key` unless disabled or at the concurrency limit."""
+        if not PREFETCH_ENABLED:
+            return False
+        prefetch = _Prefetch(key)
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                self._stats["skipped"] += 1
+                return False
+            previous = self._pending.get(slot)
+            if previous is not None and previous.key == key:
+                return False
+            self._pending[slot] = prefetch
+            self._inflight += 1
+            self._stats["issued"] += 1
+        if previous is not None:
+            self._cancel(previous)
+
+        def worker():
+            try:
+                with self._lock:
+                    if prefetch.state == "cancelled":
+                        return
+                    # Timed from here: time spent queued or frozen between invocations does not count
+                    prefetch.deadline = Deadline.after(self.timeout_s)
+                    prefetch.state = "running"
+                with deadline_scope(prefetch.deadline), query_priority("export"):
+                    fetch()
+                with self._lock:
+                    self._stats["completed"] += 1
+                    if prefetch.state == "running":
+                        prefetch.state = "done"
+                        prefetch.completed_at = time.time()
+            except Exception as e:
+                with self._lock:
+                    self._stats["failed"] += 1
+                    if prefetch.state == "running":
+                        prefetch.state = "failed"
+                    if self._pending.get(slot) is prefetch:
+                        self._pending.pop(slot, None)
+                print(f"[prefetch:error] slot={slot} err={e}")
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+
+        threading.Thread(target=worker, name=f"prefetch-{slot}", daemon=True).start()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["inflight"] = self._inflight
+        resolved = stats["hits"] + stats["joined"] + stats["missed"] + stats["cancelled"]
+        stats["hitRate"] = round(stats["hits"] / resolved, 3) if resolved else None
+        return stats
+
+
+PREFETCHER = Prefetcher()
@@ -0,0 +1,109 @@
+import hashlib
+import re
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Whitespace runs outside '...' literals collapse to one space, so formatting never changes a fingerprint
+_WHITESPACE_RE = re.compile(r"('(?:[^']|'')*')|\s+")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+def to_athena_literal(value: Any) -> str:
+    """Render a Python value as an Athena SQL literal for ExecutionParameters."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def normalize_sql(sql: str) -> str:
+    return _WHITESPACE_RE.sub(lambda m: m.group(1) or " ", sql).strip()
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class Query:
+    """
+    A SQL template with `?` placeholders and the values bound to them.
+    Values travel to Athena as ExecutionParameters, never inside the SQL text, so the same logical
+    query always has the same template. `fingerprint` identifies (template, values) and is what the
+    result cache and prefetcher key on; `template_fingerprint` groups executions of one statement.
+    """
+
+    __slots__ = ("sql", "params", "_fingerprint")
+
+    def __init__(self, sql: str, params: Optional[Sequence[Any]] = None):
+        self.sql = normalize_sql(sql)
+        self.params: Tuple[Any, ...] = tuple(params or ())
+        placeholders = _LITERAL_RE.sub("", self.sql).count("?")
+        if placeholders != len(self.params):
+            raise ValueError(f"Query has {placeholders} placeholders but {len(self.params)} parameters")
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def literals(self) -> List[str]:
+        """Bound values rendered for ExecutionParameters."""
+        return [to_athena_literal(v) for v in self.params]
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = _digest(self.sql, *self.literals)
+        return self._fingerprint
+
+    @property
+    def template_fingerprint(self) -> str:
+        return _digest(self.sql)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Query) and other.fingerprint == self.fingerprint
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
+    def __repr__(self) -> str:
+        return f"Query({self.sql[:80]!r}, params={list(self.params)!r})"
+
+
+def as_query(query: Union[str, Query], params: Optional[Sequence[Any]] = None) -> Query:
+    """Accept either a Query or a raw template plus params."""
+    if isinstance(query, Query):
+        if params:
+            raise ValueError("Pass parameters inside the Query, not alongside it")
+        return query
+    return Query(query, params)
+
+
+def select(
+    table: str,
+    columns: Union[str, Iterable[str]] = "*",
+    where: Optional[Tuple[str, Sequence[Any]]] = None,
+    order_by: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Query:
+    """
+    Build `SELECT columns FROM table [where] [ORDER BY ...] [LIMIT n]`.
+    where is a (clause, values) pair such as compile_filters returns, with or without the WHERE keyword;
+    table, columns and order_by are trusted identifiers, never user input. LIMIT is rendered as a
+    validated integer because Athena does not accept a placeholder there.
+    """
+    cols = columns if isinstance(columns, str) else ", ".join(columns)
+    parts = [f"SELECT {cols} FROM {table}"]
+    params: List[Any] = []
+    if where and where[0]:
+        clause, values = where
+        parts.append(clause if clause.upper().startswith("WHERE ") else f"WHERE {clause}")
+        params.extend(values)
+    if order_by:
+        parts.append(f"ORDER BY {order_by}")
+    if limit is not None:
+        parts.append(f"LIMIT {int(limit)}")
+    return Query(" ".join(parts), params)
@@ -0,0 +1,98 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import ormsgpack
+
+JSON = "json"
+MSGPACK = "msgpack"
+ROWS = "rows"
+COLUMNAR = "columnar"
+
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+COLUMNAR_CONTENT_TYPE = "application/vnd.willa.columnar+json"
+COLUMNAR_MSGPACK_CONTENT_TYPE = "application/vnd.willa.columnar+msgpack"
+
+
+def _header(event: dict, name: str) -> str:
+    headers = (event or {}).get("headers") or {}
+    for key, value in headers.items():
+        if key.lower() == name:
+            return str(value or "")
+    return ""
+
+
+def negotiate(event: dict) -> Tuple[str, str]:
+    """
+    Return (format, layout) for a request: format is json | msgpack, layout is rows | columnar.
+    ?format= and ?layout= win over the Accept header so the options work from a browser address bar.
+    """
+    params = (event or {}).get("queryStringParameters") or {}
+    accept = _header(event, "accept").lower()
+    fmt = MSGPACK if any(t in accept for t in MSGPACK_CONTENT_TYPES + (COLUMNAR_MSGPACK_CONTENT_TYPE,)) else JSON
+    layout = COLUMNAR if "vnd.willa.columnar" in accept else ROWS
+    if params.get("format") in (JSON, MSGPACK):
+        fmt = params["format"]
+    if params.get("layout") in (ROWS, COLUMNAR):
+        layout = params["layout"]
+    return fmt, layout
+
+
+def _is_table(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(v, dict) for v in value)
+
+
+def to_columnar(value: Any) -> Any:
+    """
+    Replace every non-empty list of objects with {"columns": [...], "values": [[...], ...]}:
+    column names once, then one array per column (missing keys become null). Applied recursively,
+    so envelopes like {"items": [...], "totalCount": n} keep their shape.
+    """
+    if _is_table(value):
+        columns: List[str] = []
+        seen = set()
+        for row in value:
+            for key in row:
+                if key not in seen:
+                    seen.add(key)
+                    columns.append(key)
+        return {
+            "columns": columns,
+            "values": [[to_columnar(row.get(c)) for row in value] for c in columns],
+        }
+    if isinstance(value, dict):
+        return {k: to_columnar(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_columnar(v) for v in value]
+    return value
+
+
+def respond(event: dict, status_code: int, body: Any, methods: str = "GET,OPTIONS",
+            headers: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Build an API Gateway proxy response, encoding `body` as the client negotiated:
+    JSON (default), columnar JSON, or MessagePack (base64 with isBase64Encoded; the API needs
+    the msgpack media types listed as binary). Every controller returns through here.
+    """
+    fmt, layout = negotiate(event)
+    payload = to_columnar(body) if layout == COLUMNAR else body
+    response_headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Headers": "*",
+        "Access-Control-Allow-Methods": methods,
+        "Vary": "Accept",
+    }
+    response_headers.update(headers or {})
+    if fmt == MSGPACK:
+        packed = ormsgpack.packb(payload, option=ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_SERIALIZE_NUMPY)
+        response_headers["Content-Type"] = (
+            COLUMNAR_MSGPACK_CONTENT_TYPE if layout == COLUMNAR else MSGPACK_CONTENT_TYPES[0]
+        )
+        return {
+            "statusCode": status_code,
+            "headers": response_headers,
+            "body": base64.b64encode(packed).decode("ascii"),
+            "isBase64Encoded": True,
+        }
+    response_headers["Content-Type"] = COLUMNAR_CONTENT_TYPE if layout == COLUMNAR else "application/json"
+    return {"statusCode": status_code, "headers": response_headers, "body": json.dumps(payload)}
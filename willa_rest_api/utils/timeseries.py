@@ -0,0 +1,61 @@
+from typing import List, Tuple
+
+import numpy as np
+
+GRANULARITIES = ("hour", "day", "week", "month")
+VARIANTS = ("count", "cumulative", "moving_average")
+
+
+def day_range(start: np.datetime64, end: np.datetime64) -> np.ndarray:
+    """Inclusive range of days [start, end] as datetime64[D]."""
+    return np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1, dtype="datetime64[D]")
+
+
+def rebucket(days: np.ndarray, counts: np.ndarray, granularity: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Re-aggregate daily counts into week (Monday-start) or month buckets.
+    Returns (bucket start days as datetime64[D], summed counts). Day granularity is a no-op.
+    """
+    days = days.astype("datetime64[D]")
+    if granularity == "day" or days.size == 0:
+        return days, counts
+    if granularity == "week":
+        # 1970-01-01 was a Thursday; shift so buckets start on Monday
+        offsets = (days.astype(np.int64) + 3) % 7
+        labels = days - offsets.astype("timedelta64[D]")
+    elif granularity == "month":
+        labels = days.astype("datetime64[M]").astype("datetime64[D]")
+    else:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    buckets, inverse = np.unique(labels, return_inverse=True)
+    summed = np.bincount(inverse, weights=counts, minlength=buckets.size).astype(np.int64)
+    return buckets, summed
+
+
+def cumulative(counts: np.ndarray) -> np.ndarray:
+    """Running total across buckets."""
+    return np.cumsum(counts)
+
+
+def moving_average(counts: np.ndarray, window: int) -> np.ndarray:
+    """Trailing moving average; the first buckets average over the points available so far."""
+    window = max(1, int(window))
+    values = counts.astype(np.float64)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    idx = np.arange(1, values.size + 1)
+    lower = np.maximum(idx - window, 0)
+    return (sums[idx] - sums[lower]) / (idx - lower)
+
+
+def apply_variant(counts: np.ndarray, variant: str, window: int = 7) -> np.ndarray:
+    if variant == "cumulative":
+        return cumulative(counts)
+    if variant == "moving_average":
+        return np.round(moving_average(counts, window), 3)
+    return counts
+
+
+def to_series(labels: List[str], values: np.ndarray, label_key: str, value_key: str) -> List[dict]:
+    """Shape bucket labels and values into the API's list-of-objects format."""
+    as_list = values.tolist()
+    return [{label_key: label, value_key: value} for label, value in zip(labels, as_list)]
@@ -0,0 +1,279 @@
+import argparse
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Fraction of traces kept (0 disables tracing, 1 records every run)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# JSON-lines file to append finished traces to; when unset they are printed as "[trace] {...}" log lines
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_MAX_ATTR_CHARS = 500
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("willa_trace_span", default=None)
+_export_lock = threading.Lock()
+
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return text if len(text) <= TRACE_MAX_ATTR_CHARS else text[:TRACE_MAX_ATTR_CHARS] + "…"
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attrs", "start", "end", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:12]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.attrs = {k: _clip(v) for k, v in attrs.items()}
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update({k: _clip(v) for k, v in attrs.items()})
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self.end is not None:
+            return
+        self.end = time.time()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.add(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "startMs": round((self.start - self.trace.root_start) * 1000, 1),
+            "durationMs": round(((self.end or time.time()) - self.start) * 1000, 1),
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class Trace:
+    """Spans of one sampled run; spans may finish on any thread that inherited the context."""
+
+    def __init__(self, trace_id: str, root_start: float):
+        self.trace_id = trace_id
+        self.root_start = root_start
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def to_dict(self, root: Span) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s.start)
+        return {
+            "traceId": self.trace_id,
+            "name": root.name,
+            "startedAt": root.start,
+            "durationMs": round(((root.end or time.time()) - root.start) * 1000, 1),
+            "spans": [s.to_dict() for s in spans],
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def begin_span(name: str, **attrs: Any) -> Optional[Span]:
+    """Open a child of the current span without making it current (for callback-style APIs). None when not tracing."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent, attrs)
+
+
+@contextmanager
+def use_span(s: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Make an already-open span current (e.g. on a worker thread) without finishing it."""
+    if s is None:
+        yield None
+        return
+    token = _current_span.set(s)
+    try:
+        yield s
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Record a child span of the current one; a no-op yielding None outside a sampled trace."""
+    s = begin_span(name, **attrs)
+    if s is None:
+        yield None
+        return
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.finish(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        s.finish()
+
+
+def annotate(**attrs: Any) -> None:
+    """Attach attributes to the current span, if any."""
+    s = _current_span.get()
+    if s is not None:
+        s.set(**attrs)
+
+
+def export_trace(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str)
+    if not TRACE_EXPORT_PATH:
+        print(f"[trace] {line}")
+        return
+    with _export_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+@contextmanager
+def start_trace(name: str, sample_rate: Optional[float] = None, **attrs: Any) -> Iterator[Optional[Span]]:
+    """
+    Start a root span, sampled at TRACE_SAMPLE_RATE (or sample_rate). When sampled, spans opened
+    beneath it (including on threads that copy the context) are collected and the whole trace is
+    exported as one JSON line when the root finishes. Yields None when the run is not sampled.
+    """
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if _current_span.get() is not None or rate <= 0 or random.random() >= rate:
+        # Nested roots join the enclosing trace as an ordinary span
+        with span(name, **attrs) as s:
+            yield s
+        return
+    now = time.time()
+    trace = Trace(uuid.uuid4().hex, now)
+    root = Span(trace, name, None, attrs)
+    root.start = now
+    token = _current_span.set(root)
+    error: Optional[BaseException] = None
+    try:
+        yield root
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        root.finish(error)
+        try:
+            export_trace(trace.to_dict(root))
+        except Exception as e:
+            print(f"[trace:export:error] {e}")
+
+
+# --- Flame-style summary: python -m willa_rest_api.utils.tracing traces.jsonl ---
+
+_FLAME_ATTRS = ("tool", "model", "tokens", "status", "admissionMs", "queueMs", "execMs", "rows")
+
+
+def _load_traces(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    traces = []
+    for line in lines:
+        # Log exports may carry a timestamp/request-id prefix before the marker
+        marker = line.find("[trace] ")
+        line = (line[marker + len("[trace] "):] if marker >= 0 else line).strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            traces.append(json.loads(line))
+        except ValueError:
+            continue
+    return traces
+
+
+def format_flame(trace: Dict[str, Any], width: int = 40) -> str:
+    """Indented span tree with a bar placed on the trace's timeline."""
+    total = max(trace.get("durationMs") or 0, 1e-3)
+    spans = trace.get("spans") or []
+    children: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    for s in spans:
+        children[s.get("parentId")].append(s)
+    lines = [f"trace {trace.get('traceId')} {trace.get('name')} {total:.0f}ms"]
+
+    def walk(s: Dict[str, Any], depth: int) -> None:
+        start = int(width * s["startMs"] / total)
+        length = max(1, int(width * s["durationMs"] / total))
+        bar = " " * start + "█" * min(length, width - start)
+        attrs = s.get("attrs") or {}
+        detail = " ".join(f"{k}={attrs[k]}" for k in _FLAME_ATTRS if attrs.get(k) is not None)
+        error = " !" + s["error"] if s.get("error") else ""
+        lines.append(f"{bar:<{width}} {s['durationMs']:>8.0f}ms {'  ' * depth}{s['name']} {detail}{error}".rstrip())
+        for c in sorted(children.get(s["spanId"], []), key=lambda c: c["startMs"]):
+            walk(c, depth + 1)
+
+    for root in children.get(None, []):
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def summarize(traces: List[Dict[str, Any]]) -> str:
+    """Per span name: count, total and self time (time not covered by child spans), p50/p95."""
+    durations: Dict[str, List[float]] = defaultdict(list)
+    self_ms: Dict[str, float] = defaultdict(float)
+    for trace in traces:
+        spans = trace.get("spans") or []
+        child_ms: Dict[str, float] = defaultdict(float)
+        for s in spans:
+            if s.get("parentId"):
+                child_ms[s["parentId"]] += s["durationMs"]
+        for s in spans:
+            durations[s["name"]].append(s["durationMs"])
+            # Parallel children can exceed their parent; self time never goes negative
+            self_ms[s["name"]] += max(0.0, s["durationMs"] - child_ms.get(s["spanId"], 0.0))
+    rows = [f"{'span':<28} {'count':>6} {'total ms':>10} {'self ms':>10} {'p50':>8} {'p95':>8}"]
+    for name, values in sorted(durations.items(), key=lambda kv: -self_ms[kv[0]]):
+        values.sort()
+        p50 = values[len(values) // 2]
+        p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+        rows.append(
+            f"{name:<28} {len(values):>6} {sum(values):>10.0f} {self_ms[name]:>10.0f} {p50:>8.0f} {p95:>8.0f}"
+        )
+    return "\n".join(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize exported agent traces (JSON lines or [trace] log lines).")
+    parser.add_argument("path", nargs="?", default=TRACE_EXPORT_PATH or "-", help="trace file, or - for stdin")
+    parser.add_argument("--last", type=int, default=3, help="number of most recent traces to draw")
+    args = parser.parse_args(argv)
+    if args.path == "-":
+        traces = _load_traces(sys.stdin)
+    else:
+        with open(args.path, encoding="utf-8") as f:
+            traces = _load_traces(f)
+    if not traces:
+        print("no traces found")
+        return 1
+    for trace in traces[-args.last:]:
+        print(format_flame(trace))
+        print()
+    print(f"{len(traces)} traces")
+    print(summarize(traces))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())